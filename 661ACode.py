@@ -1,38 +1,67 @@
+import functools
+import json
 import logging
 import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
-from flask import Flask, jsonify, render_template_string, url_for
-
-from stib_client import StopConfig, StibClient
+from flask import Flask, Response, abort, jsonify, render_template, request, stream_with_context, url_for
+from jinja2 import Template
+
+from dashboard_config import (
+    DASHBOARDS_CONFIG,
+    DashboardConfig,
+    FetchPlan,
+    FetchPlanner,
+    LineGroupConfig,
+    PanelConfig,
+    load_dashboards,
+)
+from dashboard_snapshot import DashboardSnapshot, SnapshotPoller, SnapshotStore, build_snapshot
+from dashboard_templates import NOTICE_PANEL_TEMPLATE, PAGE_TEMPLATE, STOP_PANEL_TEMPLATE
+from fragment_cache import FragmentCache, content_hash
+from metrics import REGISTRY, SIZE_BUCKETS
+from stib_client import Departure, Notice, StibClient, StopConfig, get_shared_client
+from tracing import bind, finish_trace, log_trace, span, start_trace, traced
 
 app = Flask(__name__)
 LOGGER = logging.getLogger(__name__)
 
+
 BRUSSELS = ZoneInfo("Europe/Brussels")
-LINE_ID = "18"
-LINE18_STOPS = [
-    StopConfig(
-        label="in the direction of ALBERT",
-        pointid="5830",
-        destination="ALBERT",
-        static_id="5830F",
-    ),
-    StopConfig(
-        label="in the direction of VAN HAELEN",
-        pointid="0711",
-        destination="VAN HAELEN",
-        static_id="0711F",
-    ),
-]
-HEROS_STOP = StopConfig(
-    label="Towards Gare du Nord and Gare de Schaerbeek",
-    pointid="5058",
-    destination="GARE DU NORD",
-    static_id="5058F",
+DASHBOARDS = load_dashboards()
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+EVENTS_RESERVED_THREADS = 2
+
+
+def _event_stream_cap(threads: int, requested: int | None = None) -> int:
+    available = max(0, threads - EVENTS_RESERVED_THREADS)
+    if requested is not None and requested > available:
+        LOGGER.warning(
+            "EVENTS_MAX_STREAMS=%s would use every one of %s worker threads; capping at %s",
+            requested,
+            threads,
+            available,
+        )
+    return available if requested is None else min(requested, available)
+
+
+EVENTS_MAX_STREAMS = _event_stream_cap(
+    WORKER_THREADS,
+    int(os.environ["EVENTS_MAX_STREAMS"]) if os.getenv("EVENTS_MAX_STREAMS") else None,
 )
-MONITORED_NOTICE_LINES = ["1", "2", "5", "6", "18", "4", "10", "92"]
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_RETRY_MS = 5000
+EVENT_STREAM_SLOTS = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+_STREAM_PAYLOADS: dict[str, tuple[DashboardSnapshot, dict[str, object], dict[str, str], str]] = {}
+_STREAM_PAYLOADS_LOCK = threading.Lock()
 BACKGROUND_FILES = [
     "backgrounds/uccle-street.svg",
     "backgrounds/saint-gilles-rooftops.svg",
@@ -40,761 +69,538 @@ BACKGROUND_FILES = [
 ]
 
 
-def build_dashboard_context() -> dict[str, object]:
-    client = StibClient()
-    departures_by_stop, departures_error = client.get_departures_for_stops(LINE_ID, LINE18_STOPS)
-    heros_line4, heros_line4_error = client.get_departures_for_stops("4", [HEROS_STOP])
-    heros_line92, heros_line92_error = client.get_departures_for_stops("92", [HEROS_STOP])
-    traveller_notices, notices_error = client.get_traveller_notices(
-        MONITORED_NOTICE_LINES,
-        LINE18_STOPS + [HEROS_STOP],
-    )
+FETCH_DEADLINE_SECONDS = float(os.getenv("DASHBOARD_FETCH_DEADLINE_SECONDS", "8"))
+_FETCH_POOL: tuple[int, ThreadPoolExecutor] | None = None
+_FETCH_POOL_LOCK = threading.Lock()
+PLANNER = FetchPlanner(DASHBOARDS.dashboards.values())
+REFRESH_SECONDS = REGISTRY.histogram("dashboard_refresh_seconds", "Snapshot refresh duration.")
+SNAPSHOT_TIMESTAMP = REGISTRY.gauge(
+    "dashboard_snapshot_timestamp_seconds", "Unix time of the newest dashboard snapshot."
+)
+SNAPSHOT_AGE = REGISTRY.gauge("dashboard_snapshot_age_seconds", "Age of the newest dashboard snapshot.")
+RENDER_SECONDS = REGISTRY.histogram("dashboard_render_seconds", "HTML render time.", ("view",))
+RESPONSE_BYTES = REGISTRY.histogram(
+    "http_response_size_bytes", "Response body size.", ("endpoint",), buckets=SIZE_BUCKETS
+)
+STOP_ID = re.compile(r"[A-Za-z0-9]{1,10}")
 
-    all_departures = [
-        {
-            "heading": "To Work",
-            "name": "Bens",
-            "direction": "Towards Albert",
-            "display_mode": "single",
-            "departures": departures_by_stop.get("5830", [])[:3],
-            "error": departures_error,
-        },
-        {
-            "heading": "To Home",
-            "name": "Albert",
-            "direction": "Towards Van Haelen",
-            "display_mode": "single",
-            "departures": departures_by_stop.get("0711", [])[:3],
-            "error": departures_error,
-        },
-        {
-            "heading": "Heros",
-            "name": "Heros / Helden",
-            "direction": "Lines 4 and 92 towards Gare du Nord and Gare de Schaerbeek",
-            "display_mode": "grouped",
-            "error": heros_line4_error or heros_line92_error,
-            "line_groups": [
-                {
-                    "line_id": "4",
-                    "label": "Gare du Nord",
-                    "departures": heros_line4.get(HEROS_STOP.pointid, [])[:2],
-                },
-                {
-                    "line_id": "92",
-                    "label": "Gare de Schaerbeek",
-                    "departures": heros_line92.get(HEROS_STOP.pointid, [])[:2],
-                },
-            ],
-        },
+
+def _default_warm_snapshot_path() -> str:
+    deployment = content_hash(
+        [
+            DASHBOARDS_CONFIG.read_text(encoding="utf-8"),
+            os.getenv("STIB_DATA_SOURCE", "belgian_mobility"),
+            os.getenv("BELGIAN_MOBILITY_BASE_URL", ""),
+        ]
+    )
+    return str(Path(tempfile.gettempdir()) / f"661atransport-snapshot-{deployment[:12]}.json")
+
+
+WARM_SNAPSHOT_PATH = os.getenv("DASHBOARD_WARM_SNAPSHOT", _default_warm_snapshot_path()).strip()
+WARM_SNAPSHOT_MAX_AGE = float(os.getenv("DASHBOARD_WARM_SNAPSHOT_MAX_AGE", "900"))
+STORE = SnapshotStore(Path(WARM_SNAPSHOT_PATH)) if WARM_SNAPSHOT_PATH else None
+
+
+@traced("refresh")
+def fetch_dashboard_snapshot(
+    client: StibClient | None = None,
+    deadline: float | None = None,
+    plan: FetchPlan | None = None,
+) -> DashboardSnapshot:
+    client = client or get_shared_client()
+    started = time.perf_counter()
+    deadline = FETCH_DEADLINE_SECONDS if deadline is None else deadline
+    planned = plan is None
+    if planned and STORE is not None and STORE.is_leader:
+        PLANNER.track_lines(STORE.take_requested_lines())
+    plan = plan or PLANNER.plan
+    pool = _fetch_pool(len(plan.departure_batches) + 1)
+    departure_jobs = [
+        pool.submit(bind(client.get_line_departures), batch, max_stale=0)
+        for batch in plan.departure_batches
     ]
+    notices_job = pool.submit(
+        bind(client.get_traveller_notices_by_view), plan.notice_views, max_stale=0
+    )
+    done, _ = wait([*departure_jobs, notices_job], timeout=deadline)
+    for job in [*departure_jobs, notices_job]:
+        if job not in done:
+            job.cancel()
+
+    snapshot = assemble_snapshot(
+        plan,
+        deadline,
+        [job.result() if job in done else None for job in departure_jobs],
+        notices_job.result() if notices_job in done else None,
+    )
+    if planned:
+        PLANNER.settle(snapshot.departures, snapshot.errors)
+    REFRESH_SECONDS.observe(time.perf_counter() - started)
+    SNAPSHOT_TIMESTAMP.set(snapshot.fetched_at.timestamp())
+    return snapshot
+
+
+def _fetch_pool(jobs: int) -> ThreadPoolExecutor:
+    global _FETCH_POOL
+
+    with _FETCH_POOL_LOCK:
+        if _FETCH_POOL is None or _FETCH_POOL[0] < jobs:
+            previous = _FETCH_POOL
+            _FETCH_POOL = (
+                jobs,
+                ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="dashboard-fetch"),
+            )
+            if previous is not None:
+                previous[1].shutdown(wait=False)
+        return _FETCH_POOL[1]
+
+
+def assemble_snapshot(
+    plan: FetchPlan,
+    deadline: float,
+    departure_results: list[tuple[dict[str, dict[str, list[Departure]]], str | None] | None],
+    notices_result: tuple[dict[str, list[Notice]], str | None] | None,
+) -> DashboardSnapshot:
+    departures: dict[str, dict[str, list[Departure]]] = {}
+    errors: dict[str, str | None] = {}
+    for batch, result in zip(plan.departure_batches, departure_results):
+        if result is not None:
+            batch_departures, batch_error = result
+            departures.update(batch_departures)
+            errors.update({line_id: batch_error for line_id in batch})
+        else:
+            departures.update(
+                {line_id: {stop.pointid: [] for stop in stops} for line_id, stops in batch.items()}
+            )
+            errors.update(
+                {
+                    line_id: f"Line {line_id} departures missed the {deadline:g}s refresh deadline."
+                    for line_id in batch
+                }
+            )
+
+    traveller_notices: dict[str, list[Notice]] = {view: [] for view in plan.notice_views}
+    if notices_result is not None:
+        traveller_notices, errors["notices"] = notices_result
+    else:
+        errors["notices"] = f"Traveller notices missed the {deadline:g}s refresh deadline."
+
+    return build_snapshot(
+        departures=departures,
+        traveller_notices=traveller_notices,
+        errors=errors,
+    )
+
+
+def _snapshot_installed(snapshot: DashboardSnapshot) -> None:
+    SNAPSHOT_TIMESTAMP.set(snapshot.fetched_at.timestamp())
+    if STORE is not None and not STORE.is_leader:
+        PLANNER.settle(snapshot.departures, snapshot.errors)
+
+
+POLLER = SnapshotPoller(
+    fetch_dashboard_snapshot,
+    interval=float(os.getenv("DASHBOARD_REFRESH_SECONDS", "30")),
+    store=STORE,
+    warm_max_age=WARM_SNAPSHOT_MAX_AGE,
+    on_install=_snapshot_installed,
+)
+
+
+@traced("context")
+def build_dashboard_context(
+    snapshot: DashboardSnapshot | None = None, dashboard: DashboardConfig | None = None
+) -> dict[str, object]:
+    snapshot = snapshot or POLLER.current()
+    dashboard = dashboard or DASHBOARDS.default
+    now = datetime.now(BRUSSELS)
+    route_args = {} if dashboard.slug == DASHBOARDS.default_slug else {"slug": dashboard.slug}
 
     return {
-        "all_departures": all_departures,
-        "traveller_notices": traveller_notices,
-        "notices_error": notices_error,
+        "title": dashboard.title,
+        "subtitle": dashboard.subtitle,
+        "dashboard_slug": dashboard.slug,
+        "api_url": url_for("dashboard_api", **route_args),
+        "events_url": url_for("dashboard_events", **route_args),
+        "all_departures": [_panel_context(snapshot, panel, now) for panel in dashboard.panels],
+        "traveller_notices": [notice.to_dict() for notice in snapshot.notices_for(dashboard.slug)],
+        "notices_error": snapshot.error_for("notices"),
         "background_urls": [url_for("static", filename=path) for path in BACKGROUND_FILES],
         "data_source": os.getenv("STIB_DATA_SOURCE", "belgian_mobility"),
-        "updated_at": datetime.now(BRUSSELS).strftime("%H:%M:%S"),
+        "updated_at": snapshot.fetched_at.astimezone(BRUSSELS).strftime("%H:%M:%S"),
     }
 
 
-@app.route("/healthz")
-def healthz():
-    return jsonify({"status": "ok", "service": "661aTransport"}), 200
+@traced("context")
+def build_stop_context(
+    pointid: str, line_ids: list[str], snapshot: DashboardSnapshot | None = None
+) -> dict[str, object]:
+    snapshot = snapshot or POLLER.current()
+    PLANNER.track_lines(line_ids)
+    if line_ids and STORE is not None and not STORE.is_leader:
+        STORE.request_lines(line_ids)
+
+    line_ids = line_ids or snapshot.lines_at(pointid)
+    known_panel = next(
+        (
+            panel
+            for dashboard in DASHBOARDS.dashboards.values()
+            for panel in dashboard.panels
+            if panel.stop.pointid == pointid
+        ),
+        None,
+    )
+    name = known_panel.name if known_panel else f"Stop {pointid}"
+    panel = PanelConfig(
+        panel_id=f"stop-{pointid}",
+        heading=f"Stop {pointid}",
+        name=name,
+        direction=f"Line {', '.join(line_ids)}" if line_ids else "",
+        stop=known_panel.stop if known_panel else StopConfig(label=name, pointid=pointid, destination=""),
+        line_groups=tuple(LineGroupConfig(line_id=line_id) for line_id in line_ids),
+        display_mode="grouped" if len(line_ids) > 1 else "single",
+        limit=4,
+    )
+    now = datetime.now(BRUSSELS)
+    stop_panel = _panel_context(snapshot, panel, now)
+    planned = set(PLANNER.plan.line_ids)
+    untracked = [
+        line_id
+        for line_id in line_ids
+        if line_id not in snapshot.departures
+        or (not snapshot.departures[line_id] and line_id not in planned)
+    ]
+    if untracked:
+        queued = [line_id for line_id in untracked if PLANNER.is_pending(line_id)]
+        refused = [line_id for line_id in untracked if line_id not in queued]
+        messages = []
+        if queued:
+            messages.append(f"Line {', '.join(queued)} will be available shortly.")
+        if refused:
+            messages.append(f"Line {', '.join(refused)} is not tracked on this server.")
+        stop_panel["error"] = " ".join(messages)
+    elif not line_ids:
+        stop_panel["departures"] = []
+        stop_panel["error"] = f"No tracked line serves stop {pointid} yet; pass ?lines= to add one."
+
+    route_args = {"pointid": pointid, **({"lines": ",".join(line_ids)} if line_ids else {})}
+    return {
+        "title": name,
+        "subtitle": f"Live departures at stop {pointid}.",
+        "dashboard_slug": None,
+        "api_url": url_for("stop_board_api", **route_args),
+        "events_url": None,
+        "all_departures": [stop_panel],
+        "traveller_notices": [notice.to_dict() for notice in _stop_notices(snapshot, line_ids)],
+        "notices_error": snapshot.error_for("notices"),
+        "background_urls": [url_for("static", filename=path) for path in BACKGROUND_FILES],
+        "data_source": os.getenv("STIB_DATA_SOURCE", "belgian_mobility"),
+        "updated_at": snapshot.fetched_at.astimezone(BRUSSELS).strftime("%H:%M:%S"),
+    }
 
 
-@app.route("/")
-def dashboard():
-    html = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="utf-8" />
-    <title>661A Transport App</title>
-    <meta http-equiv="refresh" content="60" />
-    <meta name="viewport" content="width=device-width,initial-scale=1" />
-    <meta name="theme-color" content="#00B8E6" />
-    <link rel="icon" href="{{ url_for('static', filename='favicon.svg') }}" type="image/svg+xml" />
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --cyan: #00b8e6;
-            --teal: #1ad9be;
-            --green: #00cc66;
-            --bg: #f8f9fa;
-            --surface: rgba(255, 255, 255, 0.95);
-            --surface-strong: #ffffff;
-            --surface-soft: #eef5f7;
-            --text: #12202d;
-            --muted: #5c6d79;
-            --border: rgba(18, 32, 45, 0.10);
-            --shadow: 0 18px 46px rgba(18, 48, 77, 0.10);
-            --accent: linear-gradient(135deg, var(--cyan), var(--teal) 52%, var(--green));
-        }
-
-        * { box-sizing: border-box; }
-        html, body { margin: 0; min-height: 100%; }
-        body {
-            font-family: "Inter", sans-serif;
-            color: var(--text);
-            background: var(--bg);
-            overflow-x: hidden;
-        }
-
-        .bg-layer {
-            position: fixed;
-            inset: 0;
-            width: 100%;
-            height: 100%;
-            object-fit: cover;
-            opacity: 0;
-            transition: opacity 1.4s ease;
-            filter: saturate(1.02) contrast(1.02) brightness(1.08);
-            z-index: 0;
-        }
-
-        .bg-layer.is-visible { opacity: 1; }
-
-        .overlay {
-            position: fixed;
-            inset: 0;
-            z-index: 1;
-            background:
-                radial-gradient(circle at 16% 12%, rgba(0, 184, 230, 0.14), transparent 28%),
-                radial-gradient(circle at 84% 10%, rgba(0, 204, 102, 0.12), transparent 24%),
-                linear-gradient(180deg, rgba(248, 249, 250, 0.74), rgba(248, 249, 250, 0.96));
-        }
-
-        .grain {
-            position: fixed;
-            inset: 0;
-            z-index: 2;
-            pointer-events: none;
-            opacity: 0.04;
-            background-image:
-                linear-gradient(rgba(18,32,45,0.04) 1px, transparent 1px),
-                linear-gradient(90deg, rgba(18,32,45,0.03) 1px, transparent 1px);
-            background-size: 144px 144px;
-        }
-
-        .shell {
-            position: relative;
-            z-index: 3;
-            min-height: 100vh;
-            padding: 22px 18px 30px;
-        }
-
-        .hero {
-            max-width: 1200px;
-            margin: 0 auto 24px;
-            padding: 32px 32px 24px;
-            border: 1px solid var(--border);
-            border-radius: 28px;
-            background:
-                linear-gradient(135deg, rgba(0, 184, 230, 0.10), rgba(26, 217, 190, 0.10) 42%, rgba(255,255,255,0.96) 42%),
-                rgba(255,255,255,0.96);
-            box-shadow: var(--shadow);
-            backdrop-filter: blur(18px);
-        }
-
-        .hero-top {
-            display: flex;
-            align-items: flex-start;
-            justify-content: space-between;
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-
-        .eyebrow {
-            display: inline-flex;
-            align-items: center;
-            gap: 10px;
-            padding: 8px 14px;
-            border-radius: 999px;
-            background: rgba(0, 184, 230, 0.08);
-            border: 1px solid rgba(0, 184, 230, 0.12);
-            font-size: 0.78rem;
-            text-transform: uppercase;
-            letter-spacing: 0.16em;
-            color: #007d9d;
-        }
-
-        .eyebrow-dot {
-            width: 9px;
-            height: 9px;
-            border-radius: 50%;
-            background: var(--green);
-            box-shadow: 0 0 0 6px rgba(0, 204, 102, 0.12);
-        }
-
-        .title {
-            margin: 16px 0 10px;
-            font-size: clamp(2.4rem, 5.2vw, 4.3rem);
-            line-height: 0.98;
-            letter-spacing: -0.05em;
-            font-weight: 800;
-            max-width: 12ch;
-        }
-
-        .subtitle {
-            max-width: 62ch;
-            margin: 0;
-            color: var(--muted);
-            font-size: 1.02rem;
-            line-height: 1.65;
-        }
-
-        .clock-wrap {
-            min-width: 240px;
-            padding: 18px 20px;
-            border-radius: 20px;
-            background: rgba(255, 255, 255, 0.78);
-            border: 1px solid rgba(18, 32, 45, 0.08);
-            text-align: right;
-        }
-
-        .clock-label {
-            color: var(--muted);
-            font-size: 0.75rem;
-            letter-spacing: 0.16em;
-            text-transform: uppercase;
-        }
-
-        .clock-value {
-            margin-top: 10px;
-            font-size: clamp(2.1rem, 4vw, 3rem);
-            font-weight: 800;
-            letter-spacing: 0.06em;
-            color: var(--text);
-        }
-
-        .status-row {
-            display: flex;
-            flex-wrap: wrap;
-            align-items: center;
-            gap: 12px;
-        }
-
-        .status-pill {
-            padding: 10px 14px;
-            border-radius: 999px;
-            background: rgba(255, 255, 255, 0.84);
-            border: 1px solid rgba(18, 32, 45, 0.08);
-            color: var(--muted);
-            font-size: 0.92rem;
-        }
-
-        .status-pill strong {
-            color: var(--text);
-            font-weight: 800;
-        }
-
-        .dashboard-grid {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: grid;
-            grid-template-columns: repeat(3, minmax(0, 1fr));
-            gap: 18px;
-            align-items: stretch;
-        }
-
-        .panel {
-            border: 1px solid var(--border);
-            border-radius: 28px;
-            background: var(--surface);
-            box-shadow: var(--shadow);
-            backdrop-filter: blur(18px);
-            overflow: hidden;
-            height: 100%;
-        }
-
-        .panel-inner { padding: 24px; }
-
-        .panel-kicker {
-            color: #0a8cad;
-            font-size: 0.74rem;
-            letter-spacing: 0.16em;
-            text-transform: uppercase;
-            margin-bottom: 10px;
-            font-weight: 700;
-        }
-
-        .panel-title {
-            margin: 0 0 6px;
-            font-size: 1.7rem;
-            line-height: 1.1;
-            font-weight: 800;
-        }
-
-        .panel-copy {
-            margin: 0;
-            color: var(--muted);
-            line-height: 1.6;
-        }
-
-        .stop-card .panel-title {
-            font-size: 1.45rem;
-            min-height: 3.1rem;
-        }
-
-        .departure-list {
-            display: flex;
-            flex-direction: column;
-            gap: 12px;
-            margin-top: 18px;
-        }
-
-        .departure {
-            display: grid;
-            grid-template-columns: 1fr auto auto;
-            align-items: center;
-            gap: 12px;
-            padding: 14px 16px;
-            border-radius: 18px;
-            background: var(--surface-soft);
-            border: 1px solid rgba(18, 32, 45, 0.06);
-        }
-
-        .departure-destination {
-            font-weight: 800;
-            letter-spacing: 0.04em;
-        }
-
-        .departure-minutes {
-            min-width: 64px;
-            padding: 8px 12px;
-            border-radius: 999px;
-            text-align: center;
-            font-weight: 800;
-            color: white;
-            background: var(--accent);
-        }
-
-        .departure-time {
-            min-width: 62px;
-            text-align: right;
-            color: #0387a8;
-            font-weight: 700;
-        }
-
-        .empty-state {
-            margin-top: 18px;
-            padding: 16px 18px;
-            border-radius: 18px;
-            color: var(--muted);
-            background: var(--surface-soft);
-            border: 1px solid rgba(18, 32, 45, 0.06);
-            line-height: 1.6;
-        }
-
-        .line-groups {
-            display: flex;
-            flex-direction: column;
-            gap: 16px;
-            margin-top: 22px;
-        }
-
-        .line-group {
-            padding: 16px;
-            border-radius: 20px;
-            background: linear-gradient(180deg, rgba(0, 184, 230, 0.04), rgba(26, 217, 190, 0.06));
-            border: 1px solid rgba(18, 32, 45, 0.06);
-        }
-
-        .line-group-header {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            gap: 12px;
-            margin-bottom: 12px;
-        }
-
-        .line-pill {
-            display: inline-flex;
-            align-items: center;
-            padding: 8px 12px;
-            border-radius: 999px;
-            background: var(--accent);
-            color: white;
-            font-size: 0.82rem;
-            font-weight: 800;
-            letter-spacing: 0.06em;
-        }
-
-        .line-group-title {
-            color: #007d9d;
-            font-size: 0.95rem;
-            font-weight: 700;
-            text-align: right;
-        }
-
-        .line-departures {
-            display: flex;
-            flex-direction: column;
-            gap: 10px;
-        }
-
-        .line-departure {
-            display: grid;
-            grid-template-columns: auto auto;
-            justify-content: space-between;
-            align-items: center;
-            gap: 12px;
-            padding: 12px 14px;
-            border-radius: 16px;
-            background: rgba(255, 255, 255, 0.82);
-            border: 1px solid rgba(18, 32, 45, 0.05);
-        }
-
-        .line-minutes {
-            font-weight: 800;
-            color: var(--text);
-        }
-
-        .line-time {
-            color: var(--muted);
-            font-weight: 700;
-        }
-
-        .notice-panel {
-            grid-column: 1 / -1;
-            background: var(--surface-strong);
-        }
-
-        .notice-header {
-            display: flex;
-            align-items: end;
-            justify-content: space-between;
-            gap: 18px;
-            margin-bottom: 18px;
-        }
-
-        .notice-grid {
-            display: grid;
-            grid-template-columns: repeat(3, minmax(0, 1fr));
-            gap: 14px;
-        }
-
-        .notice-card {
-            min-height: 240px;
-            display: flex;
-            flex-direction: column;
-            gap: 14px;
-            padding: 20px;
-            border-radius: 22px;
-            background: linear-gradient(180deg, rgba(0, 184, 230, 0.03), rgba(26, 217, 190, 0.05));
-            border: 1px solid rgba(18, 32, 45, 0.06);
-        }
-
-        .notice-top {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            gap: 14px;
-        }
-
-        .notice-badge {
-            display: inline-flex;
-            align-items: center;
-            gap: 10px;
-            padding: 8px 12px;
-            border-radius: 999px;
-            text-transform: uppercase;
-            letter-spacing: 0.12em;
-            font-size: 0.72rem;
-            font-weight: 800;
-        }
-
-        .notice-badge.major {
-            background: rgba(0, 184, 230, 0.14);
-            color: #007d9d;
-        }
-
-        .notice-badge.important {
-            background: rgba(26, 217, 190, 0.14);
-            color: #018c79;
-        }
-
-        .notice-badge.advisory {
-            background: rgba(0, 204, 102, 0.12);
-            color: #13834a;
-        }
-
-        .notice-kind {
-            color: var(--muted);
-            font-size: 0.84rem;
-            font-weight: 700;
-        }
-
-        .notice-text {
-            margin: 0;
-            font-size: 1.05rem;
-            line-height: 1.75;
-            color: var(--text);
-            flex: 1;
-        }
-
-        .notice-date {
-            margin: -2px 0 0;
-            color: #007d9d;
-            font-size: 0.86rem;
-            font-weight: 700;
-        }
-
-        .notice-meta {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-        }
-
-        .notice-chip {
-            padding: 8px 10px;
-            border-radius: 999px;
-            background: rgba(0, 184, 230, 0.06);
-            border: 1px solid rgba(0, 184, 230, 0.10);
-            color: #0a8cad;
-            font-size: 0.84rem;
-            font-weight: 700;
-        }
-
-        @media (max-width: 1100px) {
-            .hero-top,
-            .notice-header {
-                flex-direction: column;
-                align-items: flex-start;
+def _stop_notices(snapshot: DashboardSnapshot, line_ids: list[str]) -> list[Notice]:
+    wanted = set(line_ids)
+    notices: dict[str, Notice] = {}
+    for view_notices in snapshot.traveller_notices.values():
+        for notice in view_notices:
+            if wanted.intersection(notice.lines):
+                notices.setdefault(notice.text, notice)
+    return sorted(notices.values(), key=lambda item: (-item.priority, item.text))[:6]
+
+
+def _panel_context(
+    snapshot: DashboardSnapshot, panel: PanelConfig, now: datetime
+) -> dict[str, object]:
+    pointid = panel.stop.pointid
+    errors = [snapshot.error_for(group.line_id) for group in panel.line_groups]
+    context: dict[str, object] = {
+        "panel_id": panel.panel_id,
+        "heading": panel.heading,
+        "name": panel.name,
+        "direction": panel.direction,
+        "display_mode": panel.display_mode,
+        "error": next((error for error in errors if error), None),
+    }
+    if panel.display_mode == "grouped":
+        context["line_groups"] = [
+            {
+                "line_id": group.line_id,
+                "label": group.label,
+                "departures": _upcoming(
+                    snapshot.departures_for(group.line_id, pointid), now, panel.limit
+                ),
             }
-
-            .clock-wrap {
-                width: 100%;
-                text-align: left;
+            for group in panel.line_groups
+        ]
+    else:
+        departures = sorted(
+            (
+                departure
+                for group in panel.line_groups
+                for departure in snapshot.departures_for(group.line_id, pointid)
+            ),
+            key=lambda departure: departure.arrival,
+        )
+        context["departures"] = _upcoming(tuple(departures), now, panel.limit)
+    return context
+
+
+TEMPLATES = {"page": PAGE_TEMPLATE, "stop": STOP_PANEL_TEMPLATE, "notices": NOTICE_PANEL_TEMPLATE}
+FRAGMENTS = FragmentCache()
+
+
+@functools.cache
+def _template(name: str) -> Template:
+    return app.jinja_env.from_string(TEMPLATES[name])
+
+
+def render_dashboard(context: dict[str, object]) -> str:
+    view = "stop" if context["dashboard_slug"] is None else "dashboard"
+    with RENDER_SECONDS.time(view=view), span("render", view):
+        stop_panels = [
+            FRAGMENTS.render("stop", _template("stop"), stop=stop)
+            for stop in context["all_departures"]
+        ]
+        notice_panel = FRAGMENTS.render(
+            "notices",
+            _template("notices"),
+            traveller_notices=context["traveller_notices"],
+            notices_error=context["notices_error"],
+        )
+        return render_template(_template("page"), stop_panels=stop_panels, notice_panel=notice_panel, **context)
+
+
+def _upcoming(
+    departures: tuple[Departure, ...], now: datetime, limit: int
+) -> list[dict[str, object]]:
+    return [departure.to_dict(now) for departure in departures if departure.arrival >= now][:limit]
+
+
+@traced("payload")
+def dashboard_payload(context: dict[str, object]) -> dict[str, object]:
+    return {
+        "updated_at": context["updated_at"],
+        "data_source": context["data_source"],
+        "panels": [_panel_payload(stop) for stop in context["all_departures"]],
+        "notices": [
+            {
+                "text": notice["text"],
+                "priority_label": notice["priority_label"],
+                "priority_tone": notice["priority_tone"],
+                "scope_label": notice["scope_label"],
+                "linked_date": notice["linked_date"],
+                "lines": notice["lines"],
             }
+            for notice in context["traveller_notices"]
+        ],
+        "notices_error": context["notices_error"],
+    }
 
-            .dashboard-grid {
-                grid-template-columns: repeat(2, minmax(0, 1fr));
-            }
 
-            .notice-grid {
-                grid-template-columns: 1fr;
+def _panel_payload(stop: dict[str, object]) -> dict[str, object]:
+    payload = {
+        "id": stop["panel_id"],
+        "display_mode": stop["display_mode"],
+        "error": stop["error"],
+    }
+    if stop["display_mode"] == "grouped":
+        payload["line_groups"] = [
+            {
+                "line_id": group["line_id"],
+                "label": group["label"],
+                "departures": [_departure_payload(dep) for dep in group["departures"]],
             }
-        }
+            for group in stop["line_groups"]
+        ]
+    else:
+        payload["departures"] = [_departure_payload(dep) for dep in stop["departures"]]
+    return payload
 
-        @media (max-width: 720px) {
-            .shell {
-                padding: 14px 14px 24px;
-            }
 
-            .hero,
-            .panel {
-                border-radius: 22px;
-            }
+def _departure_payload(departure: dict[str, object]) -> dict[str, object]:
+    return {
+        "destination": departure["destination"],
+        "minutes_until": departure["minutes_until"],
+        "time_local": departure["time_local"],
+        "expected_at": departure["expected_at"],
+    }
 
-            .hero,
-            .panel-inner {
-                padding: 20px;
-            }
 
-            .dashboard-grid {
-                grid-template-columns: 1fr;
-            }
+def _dashboard_event_stream(last_event_id: str, dashboard: DashboardConfig) -> Iterator[str]:
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    sent: dict[str, str] | None = None
+    version = POLLER.version
+    while True:
+        payload, signatures, event_id = _shared_stream_payload(dashboard)
+        if sent is None and last_event_id == event_id:
+            sent = signatures
+
+        delta = _payload_delta(payload, signatures, sent or {})
+        if delta:
+            yield f"id: {event_id}\nevent: dashboard\ndata: {json.dumps(delta, separators=(',', ':'))}\n\n"
+        sent = signatures
+
+        next_version = POLLER.wait_for_update(version, EVENTS_HEARTBEAT_SECONDS)
+        if next_version == version:
+            yield ": keepalive\n\n"
+        version = next_version
+
+
+def _shared_stream_payload(
+    dashboard: DashboardConfig,
+) -> tuple[dict[str, object], dict[str, str], str]:
+    snapshot = POLLER.current()
+    with _STREAM_PAYLOADS_LOCK:
+        cached = _STREAM_PAYLOADS.get(dashboard.slug)
+        if cached is None or cached[0] is not snapshot:
+            payload = dashboard_payload(build_dashboard_context(snapshot, dashboard))
+            signatures = _payload_signatures(payload)
+            cached = (snapshot, payload, signatures, content_hash(signatures))
+            _STREAM_PAYLOADS[dashboard.slug] = cached
+        return cached[1], cached[2], cached[3]
+
+
+def _payload_signatures(payload: dict[str, object]) -> dict[str, str]:
+    signatures = {
+        f"panel:{panel['id']}": content_hash(_strip_countdowns(panel)) for panel in payload["panels"]
+    }
+    signatures["notices"] = content_hash([payload["notices"], payload["notices_error"]])
+    return signatures
 
-            .departure {
-                grid-template-columns: 1fr auto;
-            }
 
-            .departure-time {
-                grid-column: 1 / -1;
-                text-align: left;
-                padding-left: 2px;
-            }
-        }
-    </style>
-    <script>
-        const backgroundUrls = {{ background_urls|tojson }};
-        function updateClock() {
-            const now = new Date();
-            const h = String(now.getHours()).padStart(2, "0");
-            const m = String(now.getMinutes()).padStart(2, "0");
-            const s = String(now.getSeconds()).padStart(2, "0");
-            document.getElementById("clock").textContent = h + ":" + m + ":" + s;
-            document.getElementById("nextrefresh").textContent = (60 - now.getSeconds()) + "s";
-        }
-
-        function setupBackgroundRotation() {
-            if (backgroundUrls.length < 2) {
-                return;
-            }
+def _payload_delta(
+    payload: dict[str, object], signatures: dict[str, str], sent: dict[str, str]
+) -> dict[str, object]:
+    panels = [
+        panel
+        for panel in payload["panels"]
+        if sent.get(f"panel:{panel['id']}") != signatures[f"panel:{panel['id']}"]
+    ]
+    delta: dict[str, object] = {}
+    if panels:
+        delta["panels"] = panels
+    if sent.get("notices") != signatures["notices"]:
+        delta["notices"] = payload["notices"]
+        delta["notices_error"] = payload["notices_error"]
+    if delta:
+        delta["updated_at"] = payload["updated_at"]
+    return delta
+
+
+def _strip_countdowns(value: object) -> object:
+    if isinstance(value, dict):
+        return {key: _strip_countdowns(item) for key, item in value.items() if key != "minutes_until"}
+    if isinstance(value, list):
+        return [_strip_countdowns(item) for item in value]
+    return value
+
+
+@app.before_request
+def start_snapshot_poller():
+    POLLER.start()
+
+
+@app.before_request
+def start_request_trace():
+    start_trace(request.endpoint or "unknown", request.headers.get("X-Request-ID"))
+
+
+@app.after_request
+def finish_request_trace(response: Response) -> Response:
+    trace = finish_trace()
+    if trace is not None:
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["X-Request-ID"] = trace.request_id
+        log_trace(trace, method=request.method, path=request.path, status=response.status_code)
+    return response
+
+
+@app.after_request
+def record_response_metrics(response: Response) -> Response:
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(
+            response.calculate_content_length() or 0, endpoint=request.endpoint or "unknown"
+        )
+    REGISTRY.maybe_flush()
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    values = REGISTRY.collect()
+    fetched_at = values.get(SNAPSHOT_TIMESTAMP.name, {}).get(())
+    if fetched_at is not None:
+        values[SNAPSHOT_AGE.name] = {(): max(0.0, time.time() - fetched_at)}
+    return Response(REGISTRY.render(values), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "service": "661aTransport"}), 200
+
+
+@app.route("/")
+@app.route("/d/<slug>")
+def dashboard(slug: str | None = None):
+    return render_dashboard(build_dashboard_context(dashboard=_dashboard_or_404(slug)))
+
+
+@app.route("/api/dashboard")
+@app.route("/api/dashboard/<slug>")
+def dashboard_api(slug: str | None = None):
+    context = build_dashboard_context(dashboard=_dashboard_or_404(slug))
+    response = jsonify(dashboard_payload(context))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/events")
+@app.route("/events/<slug>")
+def dashboard_events(slug: str | None = None):
+    dashboard = _dashboard_or_404(slug)
+    if not EVENT_STREAM_SLOTS.acquire(blocking=False):
+        response = jsonify({"error": "Too many live streams on this worker."})
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+
+    response = Response(
+        stream_with_context(
+            _dashboard_event_stream(request.headers.get("Last-Event-ID", ""), dashboard)
+        ),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(EVENT_STREAM_SLOTS.release)
+    return response
+
+
+@app.route("/stop/<pointid>")
+def stop_board(pointid: str):
+    return render_dashboard(build_stop_context(pointid, _requested_lines(pointid)))
+
+
+@app.route("/api/stop/<pointid>")
+def stop_board_api(pointid: str):
+    response = jsonify(dashboard_payload(build_stop_context(pointid, _requested_lines(pointid))))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _requested_lines(pointid: str) -> list[str]:
+    line_ids = [line_id.strip() for line_id in request.args.get("lines", "").split(",") if line_id.strip()]
+    if not STOP_ID.fullmatch(pointid) or not all(STOP_ID.fullmatch(line_id) for line_id in line_ids):
+        abort(400)
+    return list(dict.fromkeys(line_ids))
 
-            const layers = [
-                document.getElementById("bg-primary"),
-                document.getElementById("bg-secondary")
-            ];
-            let active = 0;
-            let nextIndex = 1;
-
-            function rotateBackground() {
-                const incomingIndex = 1 - active;
-                const nextUrl = backgroundUrls[nextIndex];
-                const preloaded = new Image();
-
-                preloaded.onload = function () {
-                    layers[incomingIndex].src = nextUrl;
-                    layers[incomingIndex].classList.add("is-visible");
-                    layers[active].classList.remove("is-visible");
-                    active = incomingIndex;
-                    nextIndex = (nextIndex + 1) % backgroundUrls.length;
-                };
-
-                preloaded.src = nextUrl;
-            }
 
-            setInterval(rotateBackground, 15000);
-        }
-
-        window.addEventListener("load", function () {
-            updateClock();
-            setupBackgroundRotation();
-            setInterval(updateClock, 1000);
-        });
-    </script>
-</head>
-<body>
-    <img id="bg-primary" class="bg-layer is-visible" src="{{ background_urls[0] }}" alt="Brussels streetscape background" />
-    <img id="bg-secondary" class="bg-layer" src="{{ background_urls[1] if background_urls|length > 1 else background_urls[0] }}" alt="" aria-hidden="true" />
-    <div class="overlay"></div>
-    <div class="grain"></div>
-
-    <main class="shell">
-        <section class="hero">
-            <div class="hero-top">
-                <div>
-                    <div class="eyebrow">
-                        <span class="eyebrow-dot"></span>
-                        Live commuter view
-                    </div>
-                    <h1 class="title">661A Transport App</h1>
-                    <p class="subtitle">
-                        Live line 18 departures between Bens and Albert, with clear service updates underneath.
-                    </p>
-                </div>
-                <div class="clock-wrap">
-                    <div class="clock-label">Local Brussels time</div>
-                    <div id="clock" class="clock-value">{{ updated_at }}</div>
-                </div>
-            </div>
-
-            <div class="status-row">
-                <div class="status-pill">Auto refresh in <strong id="nextrefresh">60s</strong></div>
-                <div class="status-pill">Source <strong>{{ data_source|replace('_', ' ')|title }}</strong></div>
-                <div class="status-pill">Updated at <strong>{{ updated_at }}</strong></div>
-            </div>
-        </section>
-
-        <section class="dashboard-grid">
-            {% for stop in all_departures %}
-            <article class="panel stop-card">
-                <div class="panel-inner">
-                    <div class="panel-kicker">{{ stop.heading }}</div>
-                    <h2 class="panel-title">{{ stop.name }}</h2>
-                    <p class="panel-copy">{{ stop.direction }}</p>
-
-                    {% if stop.display_mode == "grouped" %}
-                    <div class="line-groups">
-                        {% for group in stop.line_groups %}
-                        <section class="line-group">
-                            <div class="line-group-header">
-                                <div class="line-pill">Line {{ group.line_id }}</div>
-                                <div class="line-group-title">{{ group.label }}</div>
-                            </div>
-                            {% if group.departures %}
-                            <div class="line-departures">
-                                {% for dep in group.departures %}
-                                <div class="line-departure">
-                                    <div class="line-minutes">{{ dep.minutes_until }} min</div>
-                                    <div class="line-time">{{ dep.time_local }}</div>
-                                </div>
-                                {% endfor %}
-                            </div>
-                            {% elif stop.error %}
-                            <div class="empty-state">{{ stop.error }}</div>
-                            {% else %}
-                            <div class="empty-state">No live departures are currently available for line {{ group.line_id }}.</div>
-                            {% endif %}
-                        </section>
-                        {% endfor %}
-                    </div>
-                    {% elif stop.departures %}
-                    <div class="departure-list">
-                        {% for dep in stop.departures %}
-                        <div class="departure">
-                            <div class="departure-destination">{{ dep.destination }}</div>
-                            <div class="departure-minutes">{{ dep.minutes_until }} min</div>
-                            <div class="departure-time">{{ dep.time_local }}</div>
-                        </div>
-                        {% endfor %}
-                    </div>
-                    {% elif stop.error %}
-                    <div class="empty-state">{{ stop.error }}</div>
-                    {% else %}
-                    <div class="empty-state">No upcoming trams are currently available for this stop.</div>
-                    {% endif %}
-                </div>
-            </article>
-            {% endfor %}
-
-            <section class="panel notice-panel">
-                <div class="panel-inner">
-                    <div class="notice-header">
-                        <div>
-                            <div class="panel-kicker">Traveller information</div>
-                            <h2 class="panel-title">Service updates</h2>
-                            <p class="panel-copy">
-                                Updates are limited to metro lines and trams 18, 4, 10, and 92, with notices for your monitored stops shown first.
-                            </p>
-                        </div>
-                        <div class="status-pill">Up to 6 updates</div>
-                    </div>
-
-                    {% if traveller_notices %}
-                    <div class="notice-grid">
-                        {% for notice in traveller_notices %}
-                        <article class="notice-card">
-                            <div class="notice-top">
-                                <div class="notice-badge {{ notice.priority_tone }}">{{ notice.priority_label }}</div>
-                                <div class="notice-kind">{{ notice.scope_label }}</div>
-                            </div>
-                            <p class="notice-text">{{ notice.text }}</p>
-                            {% if notice.linked_date %}
-                            <p class="notice-date">Effective from {{ notice.linked_date }}</p>
-                            {% endif %}
-                            {% if notice.lines %}
-                            <div class="notice-meta">
-                                <div class="notice-chip">
-                                    {% if notice.lines|length == 1 %}
-                                        Line {{ notice.lines[0] }}
-                                    {% else %}
-                                        Lines {{ notice.lines|join(', ') }}
-                                    {% endif %}
-                                </div>
-                            </div>
-                            {% endif %}
-                        </article>
-                        {% endfor %}
-                    </div>
-                    {% elif notices_error %}
-                    <div class="empty-state">{{ notices_error }}</div>
-                    {% else %}
-                    <div class="empty-state">There are no active traveller notices to display right now.</div>
-                    {% endif %}
-                </div>
-            </section>
-        </section>
-    </main>
-</body>
-</html>
-"""
-    return render_template_string(html, **build_dashboard_context())
+def _dashboard_or_404(slug: str | None) -> DashboardConfig:
+    dashboard = DASHBOARDS.get(slug)
+    if dashboard is None:
+        abort(404)
+    return dashboard
 
 
 if __name__ == "__main__":
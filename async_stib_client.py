@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from stib_client import (
+    COALESCE_WAIT_SECONDS,
+    HTTP_POOL_SIZE,
+    LEGACY_WAITING_TIMES_URL,
+    UPSTREAM_COALESCED,
+    UPSTREAM_ERRORS,
+    UPSTREAM_HEDGES,
+    UPSTREAM_SECONDS,
+    WAITING_TIMES_MAX_PAGES,
+    WAITING_TIMES_ORDER_BY,
+    WAITING_TIMES_PAGE_SIZE,
+    Departure,
+    Notice,
+    StibClient,
+    StopConfig,
+    _empty_line_departures,
+    _freeze_line_stops,
+    _freeze_params,
+    _is_last_page,
+    _log_upstream_failure,
+    _metric_path,
+    _metric_source,
+    _normalizing,
+    _unique_waiting_time_records,
+)
+from tracing import span
+
+LOGGER = logging.getLogger(__name__)
+
+
+def build_async_client(pool_size: int = HTTP_POOL_SIZE) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        headers={"Accept-Encoding": "gzip, deflate"},
+    )
+
+
+class AsyncStibClient(StibClient):
+    def __init__(self, *args: Any, client: httpx.AsyncClient | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.client = client or build_async_client()
+        self._revalidations: set[asyncio.Task[None]] = set()
+        self._async_in_flight: dict[tuple[Any, ...], asyncio.Task[dict[str, Any]]] = {}
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def get_departures_for_stops(
+        self, line_id: str, stops: list[StopConfig]
+    ) -> tuple[dict[str, list[Departure]], str | None]:
+        key = ("stops", line_id, tuple(stops))
+        try:
+            payload = await self._request_json(
+                LEGACY_WAITING_TIMES_URL if self.source == "legacy" else "/rt/WaitingTimes",
+                params={
+                    "select": "pointid,lineid,passingtimes",
+                    "where": f'lineid="{line_id}"',
+                    "limit": 100,
+                },
+            )
+            with _normalizing("departures"):
+                departures = self._normalize_departure_records(payload.get("results", []), stops)
+            return self._remember(key, departures), None
+        except Exception as exc:
+            _log_upstream_failure(exc, "Unable to load departures from %s", self.source)
+            return self._last_known_good(
+                key,
+                {stop.pointid: [] for stop in stops},
+                "Departures are temporarily unavailable.",
+            )
+
+    async def get_line_departures(
+        self, line_stops: dict[str, list[StopConfig]], max_stale: float | None = None
+    ) -> tuple[dict[str, dict[str, list[Departure]]], str | None]:
+        key = ("lines", _freeze_line_stops(line_stops))
+        try:
+            records = await self._request_paged_results(
+                LEGACY_WAITING_TIMES_URL if self.source == "legacy" else "/rt/WaitingTimes",
+                params={
+                    "select": "pointid,lineid,passingtimes",
+                    "where": " OR ".join(f'lineid="{line_id}"' for line_id in line_stops),
+                },
+                max_stale=max_stale,
+            )
+            with _normalizing("departures"):
+                departures = self._index_line_departure_records(records, line_stops)
+            return self._remember(key, departures), None
+        except Exception as exc:
+            _log_upstream_failure(exc, "Unable to load line-wide departures from %s", self.source)
+            return self._last_known_good(
+                key, _empty_line_departures(line_stops), "Departures are temporarily unavailable."
+            )
+
+    async def get_traveller_notices(
+        self, monitored_lines: list[str], stops: list[StopConfig]
+    ) -> tuple[list[Notice], str | None]:
+        notices, error = await self.get_traveller_notices_by_view({"": (monitored_lines, stops)})
+        return notices[""], error
+
+    async def get_traveller_notices_by_view(
+        self, views: dict[str, tuple[list[str], list[StopConfig]]], max_stale: float | None = None
+    ) -> tuple[dict[str, list[Notice]], str | None]:
+        key = (
+            "notices",
+            tuple((view, tuple(lines), tuple(stops)) for view, (lines, stops) in views.items()),
+        )
+        try:
+            payload = await self._request_json(
+                "/rt/TravellersInformation", params={"limit": 254}, max_stale=max_stale
+            )
+            notices = {
+                view: self._notices_from_payload(payload, monitored_lines, stops)
+                for view, (monitored_lines, stops) in views.items()
+            }
+            return self._remember(key, notices), None
+        except Exception as exc:
+            _log_upstream_failure(exc, "Unable to load traveller notices")
+            return self._last_known_good(
+                key, {view: [] for view in views}, "Traveller notices are temporarily unavailable."
+            )
+
+    async def _request_json(
+        self, path: str, params: dict[str, Any] | None = None, max_stale: float | None = None
+    ) -> dict[str, Any]:
+        if self.cache is None:
+            return await self._coalesced_fetch(path, params)
+
+        key = (path, _freeze_params(params), self.source)
+        return await self._cached(key, path, lambda: self._coalesced_fetch(path, params), max_stale)
+
+    async def _cached(
+        self,
+        key: tuple[Any, ...],
+        path: str,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+        max_stale: float | None,
+    ) -> dict[str, Any]:
+        value = self.cache.lookup(key, path, lambda: self._spawn_revalidation(key, fetch), max_stale)
+        if value is not None:
+            return value
+        value = await fetch()
+        self.cache.store(key, value)
+        return value
+
+    async def _coalesced_fetch(
+        self, path: str, params: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        key = (path, _freeze_params(params), self.source)
+        flight = self._async_in_flight.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._guarded_fetch(path, params))
+            self._async_in_flight[key] = flight
+            flight.add_done_callback(lambda _: self._finish_flight(key, flight))
+            return await asyncio.shield(flight)
+
+        UPSTREAM_COALESCED.inc(path=_metric_path(path))
+        with span("coalesced", _metric_path(path)):
+            return await asyncio.wait_for(asyncio.shield(flight), COALESCE_WAIT_SECONDS)
+
+    def _finish_flight(self, key: tuple[Any, ...], flight: asyncio.Task[dict[str, Any]]) -> None:
+        if self._async_in_flight.get(key) is flight:
+            del self._async_in_flight[key]
+        if not flight.cancelled():
+            flight.exception()
+
+    def _spawn_revalidation(
+        self, key: tuple[Any, ...], fetch: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> None:
+        task = asyncio.get_running_loop().create_task(self._revalidate(key, fetch))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+
+    async def _revalidate(
+        self, key: tuple[Any, ...], fetch: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> None:
+        try:
+            self.cache.store(key, await fetch())
+        except Exception:
+            LOGGER.exception("Background refresh failed for %s; keeping stale entry", key[0])
+        finally:
+            self.cache.finish_revalidation(key)
+
+    async def _guarded_fetch(self, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        breaker = self.breakers.get(path)
+        if breaker is None:
+            breaker = self.breakers.setdefault(path, CircuitBreaker(path))
+        try:
+            return await breaker.call_async(lambda: self._hedged_fetch(path, params))
+        except CircuitOpenError:
+            UPSTREAM_ERRORS.inc(
+                path=_metric_path(path), source=_metric_source(path), kind="circuit_open"
+            )
+            raise
+
+    async def _hedged_fetch(self, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        if self.hedge_after <= 0:
+            return await self._fetch_json(path, params)
+
+        primary = asyncio.ensure_future(self._fetch_json(path, params))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        UPSTREAM_HEDGES.inc(path=_metric_path(path))
+        if self.hedge_to_legacy and path == "/rt/WaitingTimes":
+            hedge = asyncio.ensure_future(self._fetch_json(LEGACY_WAITING_TIMES_URL, params))
+        else:
+            hedge = asyncio.ensure_future(self._fetch_json(path, params))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _request_paged_results(
+        self,
+        path: str,
+        params: dict[str, Any],
+        page_size: int = WAITING_TIMES_PAGE_SIZE,
+        max_stale: float | None = None,
+    ) -> list[dict[str, Any]]:
+        params = {**params, "order_by": WAITING_TIMES_ORDER_BY}
+        if self.cache is None:
+            return (await self._fetch_pages(path, params, page_size))["results"]
+
+        key = (path, _freeze_params({**params, "limit": page_size}), self.source)
+        payload = await self._cached(
+            key, path, lambda: self._fetch_pages(path, params, page_size), max_stale
+        )
+        return payload["results"]
+
+    async def _fetch_pages(
+        self, path: str, params: dict[str, Any], page_size: int
+    ) -> dict[str, Any]:
+        records: list[dict[str, Any]] = []
+        for page in range(WAITING_TIMES_MAX_PAGES):
+            payload = await self._coalesced_fetch(
+                path, {**params, "limit": page_size, "offset": page * page_size}
+            )
+            page_results = payload.get("results", [])
+            records.extend(page_results)
+            if _is_last_page(payload, page_results, len(records), page_size):
+                break
+        return {"results": _unique_waiting_time_records(records)}
+
+    async def _fetch_json(
+        self, path: str, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        key, url, params, headers, validated = self._prepare_request(path, params)
+        connect_timeout, read_timeout = (
+            self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        )
+        labels = {"path": _metric_path(path), "source": _metric_source(path)}
+        started = time.perf_counter()
+        try:
+            with span("upstream", labels["path"]):
+                response = await self.client.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                )
+        except httpx.TimeoutException:
+            UPSTREAM_ERRORS.inc(kind="timeout", **labels)
+            raise
+        except httpx.HTTPError:
+            UPSTREAM_ERRORS.inc(kind="connection", **labels)
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, **labels)
+        if response.status_code == 304 and validated is not None:
+            return validated.payload
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc(kind="http", **labels)
+        response.raise_for_status()
+        return self._accept_payload(key, validated, response.headers, response.content, labels)
@@ -0,0 +1,62 @@
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from notice_text import NOTICE_TEXT
+from payloads import notice_texts, traveller_information_records
+
+
+def legacy_process(text: str) -> tuple[str, str, str | None]:
+    cleaned = re.sub(r"(?<=[.!?])(?=[A-Z])", " ", text)
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+
+    linked_date = None
+    for pattern in (
+        r"\b(?:from|From)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
+        r"\b(?:d[eè]s(?:\s+le)?|D[eè]s(?:\s+le)?)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
+        r"\b(?:vanaf|Vanaf)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
+    ):
+        match = re.search(pattern, cleaned)
+        if match:
+            linked_date = match.group(1)
+            break
+
+    sentences = [part.strip() for part in re.split(r"(?<=[.!?])\s+", cleaned) if part.strip()]
+    headline = " ".join(sentences[:2]) if len(sentences) >= 2 else cleaned
+    headline_key = re.sub(r"[^a-z0-9]+", " ", headline.lower()).strip()
+    return cleaned, headline_key, linked_date
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Notice text processing microbenchmark")
+    parser.add_argument("--records", type=int, default=254)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = notice_texts(traveller_information_records(args.records))
+    for text in texts:
+        processed = NOTICE_TEXT.process(text)
+        cleaned, headline_key, _ = legacy_process(text)
+        assert (processed.text, processed.headline_key) == (cleaned, headline_key), text
+
+    legacy = min(
+        timeit.repeat(lambda: [legacy_process(text) for text in texts], repeat=args.repeat, number=args.number)
+    )
+    single_pass = min(
+        timeit.repeat(lambda: [NOTICE_TEXT.process(text) for text in texts], repeat=args.repeat, number=args.number)
+    )
+    per_payload = 1_000_000 / args.number
+    print(f"records={len(texts)}")
+    print(f"legacy_us_per_payload={legacy * per_payload:.1f}")
+    print(f"single_pass_us_per_payload={single_pass * per_payload:.1f}")
+    print(f"speedup={legacy / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from payloads import traveller_information_records, waiting_times_records
+
+LINE_FILTER = re.compile(r'lineid\s*=\s*"([^"]+)"')
+POINT_FILTER = re.compile(r'pointid\s*=\s*"([^"]+)"')
+
+
+class LatencyModel:
+    def __init__(self, spec: str, rng: random.Random) -> None:
+        kind, _, raw_args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(value) for value in raw_args.split(",") if value]
+        self.rng = rng
+        if kind not in {"none", "fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Unknown latency distribution {spec!r}")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.args[0], self.args[1])
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(self.args[0], self.args[1]))
+        if self.kind == "lognormal":
+            return self.rng.lognormvariate(self.args[0], self.args[1])
+        return 0.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeUpstream:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.latency = LatencyModel(args.latency, self.rng)
+        self.bucket = TokenBucket(args.throttle_rps)
+        self.traveller = traveller_information_records(args.notices, seed=args.seed)
+        self._waiting: list[dict[str, object]] = []
+        self._waiting_built_at = 0.0
+        self._waiting_lock = threading.Lock()
+
+    def waiting_records(self) -> list[dict[str, object]]:
+        with self._waiting_lock:
+            if time.monotonic() - self._waiting_built_at > self.args.waiting_refresh:
+                self._waiting = waiting_times_records(self.args.waiting, seed=self.rng.randint(0, 10**6))
+                self._waiting_built_at = time.monotonic()
+            return self._waiting
+
+    def respond(self, path: str, query: dict[str, list[str]]) -> tuple[int, dict[str, object] | None]:
+        with self.rng_lock:
+            roll = self.rng.random()
+            delay_ms = self.latency.sample_ms()
+            if self.rng.random() < self.args.slow_rate:
+                delay_ms += self.args.slow_ms
+        if not self.bucket.take():
+            return 429, None
+        time.sleep(delay_ms / 1000)
+        if roll < self.args.error_rate:
+            return 500, None
+
+        if path.endswith("/rt/WaitingTimes") or path.endswith("/records"):
+            records = self.filter_waiting(self.waiting_records(), query.get("where", [""])[0])
+        elif path.endswith("/rt/TravellersInformation"):
+            records = self.traveller
+        else:
+            return 404, None
+
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        return 200, {"total_count": len(records), "results": records[offset : offset + limit]}
+
+    @staticmethod
+    def filter_waiting(records: list[dict[str, object]], where: str) -> list[dict[str, object]]:
+        lines = set(LINE_FILTER.findall(where))
+        points = set(POINT_FILTER.findall(where))
+        return [
+            record
+            for record in records
+            if (not lines or record["lineid"] in lines) and (not points or record["pointid"] in points)
+        ]
+
+
+def make_handler(upstream: FakeUpstream) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            parsed = urlparse(self.path)
+            status, payload = upstream.respond(parsed.path, parse_qs(parsed.query))
+            if payload is None:
+                headers = {"Retry-After": "1"} if status == 429 else {}
+                self.send_body(status, b"", headers)
+                return
+
+            body = json.dumps(payload).encode()
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_body(304, b"", {"ETag": etag})
+                return
+            self.send_body(200, body, {"ETag": etag, "Content-Type": "application/json"})
+
+        def send_body(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            if upstream.args.verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local Belgian Mobility stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency",
+        default="lognormal:4.0,0.5",
+        help="none | fixed:MS | uniform:MIN,MAX | normal:MEAN,STDDEV | lognormal:MU,SIGMA",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=8000.0)
+    parser.add_argument("--throttle-rps", type=float, default=0.0, help="answer 429 above this rate (0 = off)")
+    parser.add_argument("--waiting", type=int, default=300, help="WaitingTimes records")
+    parser.add_argument("--notices", type=int, default=254, help="TravellersInformation records")
+    parser.add_argument("--waiting-refresh", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=661)
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeUpstream(args)))
+    print(f"fake upstream on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def wait_until_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def drive(url: str, concurrency: int, duration: float) -> dict[str, object]:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker() -> None:
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                status = str(session.get(url, timeout=30).status_code)
+            except requests.RequestException as exc:
+                status = type(exc).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p90": round(percentile(latencies, 0.90), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Drive gunicorn 661ACode:app against the local fake upstream",
+        epilog="Arguments after -- are passed to fake_upstream.py, e.g. -- --error-rate 0.05",
+    )
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--upstream-port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--path", action="append", help="paths to load, default / and /api/dashboard")
+    parser.add_argument("--output", type=Path, help="also write the report as JSON")
+    args, upstream_args = parser.parse_known_args()
+    upstream_args = [arg for arg in upstream_args if arg != "--"]
+
+    env = dict(
+        os.environ,
+        BELGIAN_MOBILITY_BASE_URL=f"http://127.0.0.1:{args.upstream_port}",
+        BELGIAN_MOBILITY_SUBSCRIPTION_KEY="load-test",
+        STIB_DATA_SOURCE="belgian_mobility",
+        DASHBOARD_WARM_SNAPSHOT=str(Path(tempfile.mkdtemp()) / "snapshot.json"),
+    )
+    upstream = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fake_upstream.py"), "--port", str(args.upstream_port), *upstream_args],
+        cwd=ROOT,
+    )
+    app = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--workers",
+            str(args.workers),
+            "--threads",
+            str(args.threads),
+            "--bind",
+            f"127.0.0.1:{args.app_port}",
+            "--log-level",
+            "warning",
+            "661ACode:app",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.app_port}/healthz")
+        reports = [
+            drive(f"http://127.0.0.1:{args.app_port}{path}", args.concurrency, args.duration)
+            for path in (args.path or ["/", "/api/dashboard"])
+        ]
+    finally:
+        app.terminate()
+        upstream.terminate()
+        app.wait(10)
+        upstream.wait(10)
+
+    for report in reports:
+        latency = report["latency_ms"]
+        print(
+            f"{report['url']}: {report['throughput_rps']} req/s over {report['requests']} requests, "
+            f"p50={latency['p50']}ms p90={latency['p90']}ms p99={latency['p99']}ms "
+            f"statuses={report['statuses']}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(reports, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+BRUSSELS = ZoneInfo("Europe/Brussels")
+LINES = ["1", "2", "5", "6", "18", "4", "10", "92", "3", "7", "25", "51", "54", "81", "97"]
+POINTIDS = ["5830", "0711", "5058", "1234", "2345", "3456", "4567", "5678", "6789", "7890"]
+NOTICE_TEMPLATES = (
+    {
+        "en": "Works on {street}. From {day} {month}, line {line} diverted.Stop moved to {street}.",
+        "fr": "Travaux rue {street}. Dès le {day}/{month_number}, ligne {line} déviée.Arrêt déplacé.",
+        "nl": "Werken in de {street}. Vanaf {day}/{month_number}, lijn {line} omgeleid.Halte verplaatst.",
+    },
+    {
+        "en": "Emergency drill. {day} {month} until 2pm, M{line} limited to ALMA. M-bus between ROODEBEEK and STOKKEL.",
+        "fr": "Exercice d'urgence. Le {day} {month} jusqu'à 14h, M{line} limité à ALMA.",
+        "nl": "Noodoefening. {day} {month} tot 14u, M{line} beperkt tot ALMA.",
+    },
+    {
+        "en": "Line {line}: irregular service  due to an incident at {street}.",
+        "fr": "Ligne {line} : service irrégulier suite à un incident à {street}.",
+        "nl": "Lijn {line}: onregelmatige dienst door een incident aan {street}.",
+    },
+    {
+        "fr": "À partir du {day} {month}, la ligne {line} ne dessert plus l'arrêt {street}.",
+        "nl": "Met ingang van {day}/{month_number} bedient lijn {line} de halte {street} niet meer.",
+    },
+    {
+        "en": "Have a nice trip on our network.",
+        "fr": "Bon voyage sur nos lignes.",
+    },
+)
+STREETS = ["Brugmann", "Albert", "Van Haelen", "Louise", "Heros", "Stalle", "Vanderkindere"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def traveller_information_records(count: int, seed: int = 661) -> list[dict[str, object]]:
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        template = NOTICE_TEMPLATES[index % len(NOTICE_TEMPLATES)]
+        line = rng.choice(LINES)
+        month_number = rng.randint(1, 12)
+        values = {
+            "street": rng.choice(STREETS),
+            "day": rng.randint(1, 28),
+            "month": MONTHS[month_number - 1],
+            "month_number": month_number,
+            "line": f"{line} #{index}",
+        }
+        text = [{language: body.format(**values) for language, body in template.items()}]
+        record_lines = rng.sample(LINES, rng.randint(0, 3)) + [line]
+        records.append(
+            {
+                "content": json.dumps([{"text": text, "type": "Description"}]),
+                "lines": json.dumps([{"id": record_line} for record_line in record_lines]),
+                "points": json.dumps([{"id": point} for point in rng.sample(POINTIDS, rng.randint(0, 3))]),
+                "priority": rng.randint(1, 9),
+                "type": "LongText",
+            }
+        )
+    return records
+
+
+def waiting_times_records(
+    count: int, seed: int = 661, now: datetime | None = None
+) -> list[dict[str, object]]:
+    rng = random.Random(seed)
+    now = now or datetime.now(BRUSSELS)
+    records = []
+    for index in range(count):
+        line = LINES[index % len(LINES)]
+        pointid = POINTIDS[(index // len(LINES)) % len(POINTIDS)] if index < len(LINES) * len(POINTIDS) else f"{9000 + index}"
+        passages = [
+            {
+                "destination": {"fr": f"TERMINUS {line}", "nl": f"EINDHALTE {line}"},
+                "expectedArrivalTime": (now + timedelta(minutes=rng.randint(-2, 45))).isoformat(),
+                "lineId": line,
+            }
+            for _ in range(2)
+        ]
+        records.append({"lineid": line, "pointid": pointid, "passingtimes": json.dumps(passages)})
+    return records
+
+
+def notice_texts(records: list[dict[str, object]]) -> list[str]:
+    from stib_client import _extract_notice_text
+
+    return [_extract_notice_text(record["content"]) for record in records]
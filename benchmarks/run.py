@@ -0,0 +1,182 @@
+import argparse
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import stib_client
+from dashboard_snapshot import SnapshotPoller
+from payloads import traveller_information_records, waiting_times_records
+from stib_client import NoticeRecordMemo, StibClient, StopConfig
+
+dashboard_app = importlib.import_module("661ACode")
+
+DEFAULT_SIZES = (100, 1_000, 10_000)
+MONITORED_LINES = list(dashboard_app.DASHBOARDS.default.notice_lines)
+DASHBOARD_STOPS = dashboard_app.DASHBOARDS.default.stops
+BENCH_STOPS = DASHBOARD_STOPS + [
+    StopConfig(label=pointid, pointid=pointid, destination="?")
+    for pointid in ("1234", "2345", "3456")
+]
+
+
+class PayloadClient(StibClient):
+    def __init__(self, waiting_records, traveller_records):
+        super().__init__(source="belgian_mobility", cache=None, hedge_after=0)
+        self.waiting_records = waiting_records
+        self.traveller_records = traveller_records
+
+    def _fetch_json(self, path, params=None):
+        if path == "/rt/TravellersInformation":
+            return {"results": self.traveller_records}
+        params = params or {}
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", len(self.waiting_records)))
+        return {
+            "total_count": len(self.waiting_records),
+            "results": self.waiting_records[offset : offset + limit],
+        }
+
+
+def measure(function: Callable[[], Any], samples: int, setup: Callable[[], Any] | None = None):
+    if setup:
+        setup()
+    function()
+    timings = []
+    for _ in range(samples):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "samples": samples,
+        "min_ms": round(timings[0], 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+    }
+
+
+def bench_size(size: int, samples: int) -> list[dict[str, Any]]:
+    waiting = waiting_times_records(size)
+    traveller = traveller_information_records(size)
+    client = PayloadClient(waiting, traveller)
+    results = []
+
+    def record(case: str, **timing: Any) -> None:
+        results.append({"case": case, "size": size, **timing})
+        print(f"{case:<28} size={size:<6} median={timing['median_ms']:.3f}ms", file=sys.stderr)
+
+    record(
+        "normalize_departures",
+        **measure(lambda: client._normalize_departure_records(waiting, BENCH_STOPS), samples),
+    )
+
+    def reset_memo() -> None:
+        stib_client.NOTICE_RECORD_MEMO = NoticeRecordMemo(max_entries=max(size, 1))
+
+    record(
+        "normalize_notices_cold",
+        **measure(
+            lambda: client._normalize_traveller_notices(traveller, MONITORED_LINES, DASHBOARD_STOPS),
+            samples,
+            setup=reset_memo,
+        ),
+    )
+    reset_memo()
+    record(
+        "normalize_notices_warm",
+        **measure(
+            lambda: client._normalize_traveller_notices(traveller, MONITORED_LINES, DASHBOARD_STOPS),
+            samples,
+        ),
+    )
+
+    snapshot = dashboard_app.fetch_dashboard_snapshot(client=client, deadline=60)
+    failed = {source: error for source, error in snapshot.errors.items() if error is not None}
+    if failed:
+        raise RuntimeError(f"PayloadClient no longer stubs every upstream call: {failed}")
+
+    def build_context() -> None:
+        snapshot = dashboard_app.fetch_dashboard_snapshot(client=client, deadline=60)
+        with dashboard_app.app.test_request_context("/"):
+            dashboard_app.build_dashboard_context(snapshot)
+
+    record("build_dashboard_context", **measure(build_context, samples))
+
+    poller = SnapshotPoller(
+        lambda: dashboard_app.fetch_dashboard_snapshot(client=client, deadline=60), interval=0
+    )
+    dashboard_app.POLLER = poller
+    http = dashboard_app.app.test_client()
+    record("get_dashboard_fresh_snapshot", **measure(lambda: http.get("/"), samples, setup=poller.refresh))
+    record("get_dashboard_cached_snapshot", **measure(lambda: http.get("/"), samples))
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(item["case"], item["size"]): item for item in baseline["results"]}
+    print(f"\n{'case':<30}{'size':>7}{'before':>12}{'after':>12}{'delta':>9}")
+    for item in current:
+        before = previous.get((item["case"], item["size"]))
+        if before is None:
+            continue
+        delta = (item["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        print(
+            f"{item['case']:<30}{item['size']:>7}{before['median_ms']:>10.3f}ms"
+            f"{item['median_ms']:>10.3f}ms{delta:>+8.1f}%"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Normalization and dashboard render benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--samples", type=int, default=15)
+    parser.add_argument("--output", type=Path, default=ROOT / "bench_output.json")
+    parser.add_argument("--baseline", type=Path, help="previous output file to diff against")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(bench_size(size, args.samples))
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "json_decoder": stib_client.JSON_DECODER,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"wrote {args.output}", file=sys.stderr)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
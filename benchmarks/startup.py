@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from loadgen import ROOT, wait_until_ready
+
+CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+requests_imported = "requests" in sys.modules
+response = module.app.test_client().get(sys.argv[2])
+responded = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - imported) * 1000,
+    "status": response.status_code,
+    "requests_imported": requests_imported,
+}))
+"""
+
+
+def run_once(entry: str, path: str, env: dict[str, str]) -> dict[str, object]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, entry, path],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def summarize(label: str, runs: list[dict[str, object]]) -> dict[str, object]:
+    summary: dict[str, object] = {"mode": label, "runs": len(runs)}
+    for field in ("import_ms", "first_response_ms", "process_ms"):
+        values = sorted(float(run[field]) for run in runs)
+        summary[field] = {
+            "median": round(statistics.median(values), 1),
+            "min": round(values[0], 1),
+            "max": round(values[-1], 1),
+        }
+    summary["statuses"] = sorted({run["status"] for run in runs})
+    summary["requests_imported"] = any(run["requests_imported"] for run in runs)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure cold-start import and first-response latency of the app entry point",
+        epilog="Arguments after -- are passed to fake_upstream.py, e.g. -- --latency fixed:400",
+    )
+    parser.add_argument("--entry", default="661ACode", help="module exposing the WSGI app")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--upstream-port", type=int, default=8765)
+    parser.add_argument("--output", type=Path, help="also write the report as JSON")
+    args, upstream_args = parser.parse_known_args()
+    upstream_args = [arg for arg in upstream_args if arg != "--"]
+
+    warm_path = Path(tempfile.mkdtemp()) / "snapshot.json"
+    env = dict(
+        os.environ,
+        BELGIAN_MOBILITY_BASE_URL=f"http://127.0.0.1:{args.upstream_port}",
+        BELGIAN_MOBILITY_SUBSCRIPTION_KEY="load-test",
+        STIB_DATA_SOURCE="belgian_mobility",
+        DASHBOARD_WARM_SNAPSHOT=str(warm_path),
+    )
+    upstream = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fake_upstream.py"), "--port", str(args.upstream_port), *upstream_args],
+        cwd=ROOT,
+    )
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.upstream_port}/rt/TravellersInformation")
+        cold = []
+        for _ in range(args.runs):
+            warm_path.unlink(missing_ok=True)
+            cold.append(run_once(args.entry, args.path, env))
+        warm = [run_once(args.entry, args.path, env) for _ in range(args.runs)]
+    finally:
+        upstream.terminate()
+        upstream.wait(10)
+        warm_path.unlink(missing_ok=True)
+
+    reports = [summarize("cold", cold), summarize("warm snapshot", warm)]
+    for report in reports:
+        print(
+            f"{report['mode']}: import {report['import_ms']['median']}ms, "
+            f"first response {report['first_response_ms']['median']}ms, "
+            f"process {report['process_ms']['median']}ms (median of {report['runs']}), "
+            f"statuses={report['statuses']} requests imported at import={report['requests_imported']}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(reports, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+BREAKER_FAILURES = int(os.getenv("STIB_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("STIB_BREAKER_RESET_SECONDS", "30"))
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURES,
+        reset_after: float = BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_after:
+                return "half-open"
+            return "open"
+
+    def call(self, function: Callable[[], T]) -> T:
+        self._before_call()
+        try:
+            result = function()
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._record_success()
+        return result
+
+    async def call_async(self, function: Callable[[], Awaitable[T]]) -> T:
+        self._before_call()
+        try:
+            result = await function()
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._record_success()
+        return result
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._clock() - self._opened_at < self.reset_after or self._probing:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._probing = True
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
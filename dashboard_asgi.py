@@ -0,0 +1,271 @@
+import asyncio
+import importlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from werkzeug.security import safe_join
+
+from async_stib_client import AsyncStibClient
+from dashboard_config import FetchPlan
+from dashboard_snapshot import DashboardSnapshot
+
+dashboard_app = importlib.import_module("661ACode")
+flask_app = dashboard_app.app
+LOGGER = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+ROUTES = [
+    (re.compile(r"/(?:d/(?P<slug>[^/]+))?"), "dashboard"),
+    (re.compile(r"/api/dashboard(?:/(?P<slug>[^/]+))?"), "dashboard_api"),
+    (re.compile(r"/static/(?P<filename>.+)"), "static"),
+    (re.compile(r"/healthz"), "healthz"),
+]
+
+_CLIENT: AsyncStibClient | None = None
+
+
+def get_async_client() -> AsyncStibClient:
+    global _CLIENT
+
+    if _CLIENT is None:
+        _CLIENT = AsyncStibClient()
+    return _CLIENT
+
+
+class AsyncSnapshotPoller:
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[DashboardSnapshot]],
+        interval: float = 30.0,
+        max_age: float = 120.0,
+    ) -> None:
+        self.fetch = fetch
+        self.interval = interval
+        self.max_age = max_age
+        self._snapshot: DashboardSnapshot | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def current(self) -> DashboardSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age_seconds() > self.max_age:
+            return await self.refresh(if_older_than=self.max_age)
+        return snapshot
+
+    async def refresh(self, if_older_than: float | None = None) -> DashboardSnapshot:
+        async with self._refresh_lock:
+            snapshot = self._snapshot
+            if (
+                snapshot is not None
+                and if_older_than is not None
+                and snapshot.age_seconds() <= if_older_than
+            ):
+                return snapshot
+            self._snapshot = await self.fetch()
+            return self._snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                LOGGER.exception("Dashboard snapshot refresh failed")
+            await asyncio.sleep(self.interval)
+
+
+async def fetch_dashboard_snapshot(
+    client: AsyncStibClient | None = None,
+    deadline: float | None = None,
+    plan: FetchPlan | None = None,
+) -> DashboardSnapshot:
+    client = client or get_async_client()
+    started = time.perf_counter()
+    deadline = dashboard_app.FETCH_DEADLINE_SECONDS if deadline is None else deadline
+    plan = plan or dashboard_app.PLANNER.plan
+    departure_jobs = [
+        asyncio.ensure_future(client.get_line_departures(batch, max_stale=0))
+        for batch in plan.departure_batches
+    ]
+    notices_job = asyncio.ensure_future(
+        client.get_traveller_notices_by_view(plan.notice_views, max_stale=0)
+    )
+    done, pending = await asyncio.wait([*departure_jobs, notices_job], timeout=deadline)
+    for job in pending:
+        job.cancel()
+
+    snapshot = dashboard_app.assemble_snapshot(
+        plan,
+        deadline,
+        [job.result() if job in done else None for job in departure_jobs],
+        notices_job.result() if notices_job in done else None,
+    )
+    dashboard_app.REFRESH_SECONDS.observe(time.perf_counter() - started)
+    dashboard_app.SNAPSHOT_TIMESTAMP.set(snapshot.fetched_at.timestamp())
+    return snapshot
+
+
+POLLER = AsyncSnapshotPoller(
+    fetch_dashboard_snapshot,
+    interval=float(os.getenv("DASHBOARD_REFRESH_SECONDS", "30")),
+)
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    POLLER.start()
+    if scope["method"] not in {"GET", "HEAD"}:
+        await _respond(scope, send, 405, b"Method Not Allowed", "text/plain")
+        return
+
+    for pattern, endpoint in ROUTES:
+        match = pattern.fullmatch(scope["path"])
+        if match is not None:
+            break
+    else:
+        await _respond(scope, send, 404, b"Not Found", "text/plain")
+        return
+
+    if endpoint == "healthz":
+        body = json.dumps({"status": "ok", "service": "661aTransport"}).encode()
+        await _respond(scope, send, 200, body, "application/json")
+    elif endpoint == "static":
+        await _send_static(scope, send, match["filename"])
+    else:
+        await _send_dashboard(scope, send, match["slug"], endpoint == "dashboard_api")
+
+
+async def _send_dashboard(scope: Scope, send: Send, slug: str | None, as_json: bool) -> None:
+    dashboard = dashboard_app.DASHBOARDS.get(slug)
+    if dashboard is None:
+        await _respond(scope, send, 404, b"Not Found", "text/plain")
+        return
+
+    snapshot = await POLLER.current()
+    with flask_app.request_context(_wsgi_environ(scope)):
+        context = dashboard_app.build_dashboard_context(snapshot, dashboard)
+        context["events_url"] = None
+        if as_json:
+            body = json.dumps(dashboard_app.dashboard_payload(context), separators=(",", ":"))
+            await _respond(
+                scope,
+                send,
+                200,
+                body.encode(),
+                "application/json",
+                [(b"cache-control", b"no-cache")],
+            )
+        else:
+            body = dashboard_app.render_dashboard(context)
+            await _respond(scope, send, 200, body.encode(), "text/html; charset=utf-8")
+
+
+async def _send_static(scope: Scope, send: Send, filename: str) -> None:
+    path = safe_join(flask_app.static_folder, filename)
+    if path is None or not Path(path).is_file():
+        await _respond(scope, send, 404, b"Not Found", "text/plain")
+        return
+    body = await asyncio.to_thread(Path(path).read_bytes)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    await _respond(
+        scope, send, 200, body, content_type, [(b"cache-control", b"public, max-age=3600")]
+    )
+
+
+async def _respond(
+    scope: Scope,
+    send: Send,
+    status: int,
+    body: bytes,
+    content_type: str,
+    headers: list[tuple[bytes, bytes]] | None = None,
+) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or []),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            POLLER.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await POLLER.stop()
+            await _close_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _close_client() -> None:
+    global _CLIENT
+
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def _wsgi_environ(scope: Scope) -> dict[str, Any]:
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in {"CONTENT_TYPE", "CONTENT_LENGTH"}:
+            key = f"HTTP_{key}"
+        environ[key] = value.decode("latin-1")
+    return environ
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from stib_client import StopConfig
+
+DASHBOARDS_CONFIG = Path(os.getenv("DASHBOARDS_CONFIG", Path(__file__).with_name("dashboards.json")))
+WAITING_TIMES_LINES_PER_QUERY = int(os.getenv("STIB_WAITING_TIMES_LINES_PER_QUERY", "5"))
+STOP_BOARD_MAX_EXTRA_LINES = int(os.getenv("STOP_BOARD_MAX_EXTRA_LINES", "20"))
+STOP_BOARD_LINE_IDLE_SECONDS = float(os.getenv("STOP_BOARD_LINE_IDLE_SECONDS", "3600"))
+
+
+@dataclass(frozen=True)
+class LineGroupConfig:
+    line_id: str
+    label: str = ""
+
+
+@dataclass(frozen=True)
+class PanelConfig:
+    panel_id: str
+    heading: str
+    name: str
+    direction: str
+    stop: StopConfig
+    line_groups: tuple[LineGroupConfig, ...]
+    display_mode: str = "single"
+    limit: int = 3
+
+
+@dataclass(frozen=True)
+class DashboardConfig:
+    slug: str
+    title: str
+    notice_lines: tuple[str, ...]
+    panels: tuple[PanelConfig, ...]
+    subtitle: str = ""
+
+    @property
+    def stops(self) -> list[StopConfig]:
+        stops: dict[str, StopConfig] = {}
+        for panel in self.panels:
+            stops.setdefault(panel.stop.pointid, panel.stop)
+        return list(stops.values())
+
+    @property
+    def line_stops(self) -> dict[str, list[StopConfig]]:
+        line_stops: dict[str, dict[str, StopConfig]] = {}
+        for panel in self.panels:
+            for group in panel.line_groups:
+                line_stops.setdefault(group.line_id, {}).setdefault(panel.stop.pointid, panel.stop)
+        return {line_id: list(stops.values()) for line_id, stops in line_stops.items()}
+
+
+@dataclass(frozen=True)
+class DashboardRegistry:
+    dashboards: dict[str, DashboardConfig]
+    default_slug: str
+
+    @property
+    def default(self) -> DashboardConfig:
+        return self.dashboards[self.default_slug]
+
+    def get(self, slug: str | None) -> DashboardConfig | None:
+        return self.default if slug is None else self.dashboards.get(slug)
+
+
+@dataclass(frozen=True)
+class FetchPlan:
+    departure_batches: tuple[dict[str, list[StopConfig]], ...]
+    notice_views: dict[str, tuple[list[str], list[StopConfig]]]
+
+    @property
+    def line_ids(self) -> list[str]:
+        return [line_id for batch in self.departure_batches for line_id in batch]
+
+
+def load_dashboards(path: Path = DASHBOARDS_CONFIG) -> DashboardRegistry:
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    dashboards: dict[str, DashboardConfig] = {}
+    for item in raw.get("dashboards", []):
+        dashboard = _parse_dashboard(item)
+        if dashboard.slug in dashboards:
+            raise ValueError(f"Duplicate dashboard slug {dashboard.slug!r} in {path}")
+        dashboards[dashboard.slug] = dashboard
+
+    if not dashboards:
+        raise ValueError(f"No dashboards defined in {path}")
+    default_slug = raw.get("default") or next(iter(dashboards))
+    if default_slug not in dashboards:
+        raise ValueError(f"Default dashboard {default_slug!r} is not defined in {path}")
+    return DashboardRegistry(dashboards=dashboards, default_slug=default_slug)
+
+
+def plan_fetches(
+    dashboards: Iterable[DashboardConfig],
+    extra_lines: Iterable[str] = (),
+    lines_per_query: int = WAITING_TIMES_LINES_PER_QUERY,
+) -> FetchPlan:
+    line_stops: dict[str, dict[str, StopConfig]] = {}
+    notice_views: dict[str, tuple[list[str], list[StopConfig]]] = {}
+    for dashboard in dashboards:
+        for line_id, stops in dashboard.line_stops.items():
+            by_point = line_stops.setdefault(line_id, {})
+            for stop in stops:
+                by_point.setdefault(stop.pointid, stop)
+        notice_views[dashboard.slug] = (list(dashboard.notice_lines), dashboard.stops)
+
+    configured = [(line_id, list(by_point.values())) for line_id, by_point in line_stops.items()]
+    extra = [(line_id, []) for line_id in dict.fromkeys(extra_lines) if line_id not in line_stops]
+    batches = [
+        dict(lines[start : start + lines_per_query])
+        for lines in (configured, extra)
+        for start in range(0, len(lines), lines_per_query)
+    ]
+    return FetchPlan(departure_batches=tuple(batches), notice_views=notice_views)
+
+
+class FetchPlanner:
+    def __init__(
+        self,
+        dashboards: Iterable[DashboardConfig],
+        max_extra_lines: int = STOP_BOARD_MAX_EXTRA_LINES,
+        idle_seconds: float = STOP_BOARD_LINE_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.dashboards = list(dashboards)
+        self.max_extra_lines = max_extra_lines
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._extra_lines: dict[str, float] = {}
+        self._confirmed: set[str] = set()
+        self._rejected: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._plan = plan_fetches(self.dashboards)
+        self._configured = set(self._plan.line_ids)
+
+    @property
+    def plan(self) -> FetchPlan:
+        return self._plan
+
+    def is_pending(self, line_id: str) -> bool:
+        return line_id in self._extra_lines and line_id not in self._confirmed
+
+    def track_lines(self, line_ids: Iterable[str]) -> list[str]:
+        now = self._clock()
+        with self._lock:
+            added = []
+            for line_id in line_ids:
+                if line_id in self._configured:
+                    continue
+                if line_id in self._extra_lines:
+                    self._extra_lines[line_id] = now
+                    continue
+                if self._rejected.get(line_id, now) > now:
+                    continue
+                if len(self._extra_lines) >= self.max_extra_lines:
+                    continue
+                self._extra_lines[line_id] = now
+                added.append(line_id)
+            if added:
+                self._replan()
+            return added
+
+    def settle(
+        self, departures: Mapping[str, Mapping[str, Any]], errors: Mapping[str, str | None]
+    ) -> list[str]:
+        now = self._clock()
+        with self._lock:
+            dropped = []
+            for line_id, last_requested in list(self._extra_lines.items()):
+                if now - last_requested > self.idle_seconds:
+                    dropped.append(line_id)
+                elif line_id in departures and errors.get(line_id) is None:
+                    if departures[line_id]:
+                        self._confirmed.add(line_id)
+                    elif line_id not in self._confirmed:
+                        self._rejected[line_id] = now + self.idle_seconds
+                        dropped.append(line_id)
+            for line_id in dropped:
+                del self._extra_lines[line_id]
+                self._confirmed.discard(line_id)
+            self._rejected = {
+                line_id: until for line_id, until in self._rejected.items() if until > now
+            }
+            if dropped:
+                self._replan()
+            return dropped
+
+    def _replan(self) -> None:
+        self._plan = plan_fetches(self.dashboards, self._extra_lines)
+
+
+def _parse_dashboard(item: dict[str, Any]) -> DashboardConfig:
+    panels = tuple(_parse_panel(panel) for panel in item.get("panels", []))
+    return DashboardConfig(
+        slug=str(item["slug"]),
+        title=str(item.get("title") or item["slug"]),
+        notice_lines=tuple(str(line) for line in item.get("notice_lines", [])),
+        panels=panels,
+        subtitle=str(item.get("subtitle", "")),
+    )
+
+
+def _parse_panel(item: dict[str, Any]) -> PanelConfig:
+    line_groups = tuple(
+        LineGroupConfig(line_id=str(group["line_id"]), label=str(group.get("label", "")))
+        for group in item.get("lines", [])
+    )
+    if not line_groups:
+        raise ValueError(f"Panel {item.get('id')!r} does not list any lines")
+    stop = item["stop"]
+    return PanelConfig(
+        panel_id=str(item["id"]),
+        heading=str(item.get("heading", "")),
+        name=str(item.get("name", "")),
+        direction=str(item.get("direction", "")),
+        stop=StopConfig(
+            label=str(stop.get("label", "")),
+            pointid=str(stop["pointid"]),
+            destination=str(stop.get("destination", "")),
+            static_id=str(stop.get("static_id", "")),
+        ),
+        line_groups=line_groups,
+        display_mode=item.get("display_mode") or ("grouped" if len(line_groups) > 1 else "single"),
+        limit=int(item.get("limit", 3)),
+    )
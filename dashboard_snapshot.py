@@ -0,0 +1,402 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import IO, Any, Callable
+from zoneinfo import ZoneInfo
+
+from stib_client import Departure, Notice
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+BRUSSELS = ZoneInfo("Europe/Brussels")
+FOLLOW_SECONDS = 1.0
+SHARED_POLL_SECONDS = 0.1
+REQUEST_LINES_EVERY_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    fetched_at: datetime
+    departures: Mapping[str, Mapping[str, tuple[Departure, ...]]]
+    traveller_notices: Mapping[str, tuple[Notice, ...]]
+    errors: Mapping[str, str | None] = field(default_factory=lambda: MappingProxyType({}))
+
+    def departures_for(self, line_id: str, pointid: str) -> tuple[Departure, ...]:
+        return self.departures.get(line_id, {}).get(pointid, ())
+
+    def lines_at(self, pointid: str) -> list[str]:
+        return [line_id for line_id, by_stop in self.departures.items() if pointid in by_stop]
+
+    def notices_for(self, dashboard: str) -> tuple[Notice, ...]:
+        return self.traveller_notices.get(dashboard, ())
+
+    def error_for(self, source: str) -> str | None:
+        return self.errors.get(source)
+
+    def age_seconds(self, now: datetime | None = None) -> float:
+        return ((now or datetime.now(BRUSSELS)) - self.fetched_at).total_seconds()
+
+
+def build_snapshot(
+    departures: Mapping[str, Mapping[str, list[Departure]]],
+    traveller_notices: Mapping[str, list[Notice]],
+    errors: Mapping[str, str | None],
+    fetched_at: datetime | None = None,
+) -> DashboardSnapshot:
+    return DashboardSnapshot(
+        fetched_at=fetched_at or datetime.now(BRUSSELS),
+        departures=MappingProxyType(
+            {
+                line_id: MappingProxyType(
+                    {pointid: tuple(items) for pointid, items in by_stop.items()}
+                )
+                for line_id, by_stop in departures.items()
+            }
+        ),
+        traveller_notices=MappingProxyType(
+            {dashboard: tuple(notices) for dashboard, notices in traveller_notices.items()}
+        ),
+        errors=MappingProxyType(dict(errors)),
+    )
+
+
+def snapshot_to_dict(snapshot: DashboardSnapshot) -> dict[str, Any]:
+    return {
+        "fetched_at": snapshot.fetched_at.isoformat(),
+        "departures": {
+            line_id: {
+                pointid: [
+                    [departure.destination, departure.arrival.isoformat(), departure.lineid]
+                    for departure in departures
+                ]
+                for pointid, departures in by_stop.items()
+            }
+            for line_id, by_stop in snapshot.departures.items()
+        },
+        "traveller_notices": {
+            view: [
+                [
+                    notice.text,
+                    notice.priority,
+                    list(notice.lines),
+                    list(notice.points),
+                    notice.relevance,
+                    notice.linked_date,
+                ]
+                for notice in notices
+            ]
+            for view, notices in snapshot.traveller_notices.items()
+        },
+        "errors": dict(snapshot.errors),
+    }
+
+
+def snapshot_from_dict(raw: dict[str, Any]) -> DashboardSnapshot:
+    return build_snapshot(
+        departures={
+            line_id: {
+                pointid: [
+                    Departure(
+                        pointid=pointid,
+                        destination=destination,
+                        arrival=datetime.fromisoformat(arrival),
+                        lineid=lineid,
+                    )
+                    for destination, arrival, lineid in departures
+                ]
+                for pointid, departures in by_stop.items()
+            }
+            for line_id, by_stop in raw["departures"].items()
+        },
+        traveller_notices={
+            view: [
+                Notice(
+                    text=text,
+                    priority=priority,
+                    lines=tuple(lines),
+                    points=tuple(points),
+                    relevance=relevance,
+                    linked_date=linked_date,
+                )
+                for text, priority, lines, points, relevance, linked_date in notices
+            ]
+            for view, notices in raw["traveller_notices"].items()
+        },
+        errors=raw["errors"],
+        fetched_at=datetime.fromisoformat(raw["fetched_at"]),
+    )
+
+
+def save_snapshot(snapshot: DashboardSnapshot, path: Path) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(snapshot_to_dict(snapshot), separators=(",", ":")))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: Path) -> DashboardSnapshot | None:
+    try:
+        return snapshot_from_dict(json.loads(path.read_text()))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        LOGGER.warning("Ignoring unreadable snapshot at %s", path)
+        return None
+
+
+class SnapshotStore:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock_path = path.with_name(f"{path.name}.lock")
+        self.lines_path = path.with_name(f"{path.name}.lines")
+        self._leading = False
+        self._leader_handle: IO[str] | None = None
+        self._seen: tuple[int, int] | None = None
+        self._cached: DashboardSnapshot | None = None
+        self._lines_sent: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leading
+
+    def try_lead(self) -> bool:
+        with self._lock:
+            if self._leading:
+                return True
+            if fcntl is None:
+                self._leading = True
+                return True
+            try:
+                handle = open(self.lock_path, "a")
+            except OSError:
+                LOGGER.warning("Cannot open %s; refreshing without a shared leader", self.lock_path)
+                self._leading = True
+                return True
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+            self._leader_handle = handle
+            self._leading = True
+            LOGGER.info("Process %s now refreshes the shared snapshot", os.getpid())
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._leader_handle is not None:
+                self._leader_handle.close()
+            self._leader_handle = None
+            self._leading = False
+
+    def publish(self, snapshot: DashboardSnapshot) -> None:
+        save_snapshot(snapshot, self.path)
+        stat = self.path.stat()
+        with self._lock:
+            self._seen = (stat.st_ino, stat.st_mtime_ns)
+            self._cached = snapshot
+
+    def read(self) -> DashboardSnapshot | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        seen = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if seen != self._seen:
+                self._cached = load_snapshot(self.path)
+                self._seen = seen
+            return self._cached
+
+    def request_lines(self, line_ids: list[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                line_id
+                for line_id in dict.fromkeys(line_ids)
+                if now - self._lines_sent.get(line_id, -REQUEST_LINES_EVERY_SECONDS)
+                >= REQUEST_LINES_EVERY_SECONDS
+            ]
+            self._lines_sent.update((line_id, now) for line_id in due)
+        if not due:
+            return
+        try:
+            with open(self.lines_path, "a") as handle:
+                handle.write("".join(f"{line_id}\n" for line_id in due))
+        except OSError:
+            LOGGER.warning("Unable to record requested lines in %s", self.lines_path)
+
+    def take_requested_lines(self) -> list[str]:
+        taken = self.lines_path.with_name(f"{self.lines_path.name}.{os.getpid()}")
+        try:
+            os.replace(self.lines_path, taken)
+            lines = taken.read_text().split()
+            taken.unlink()
+        except OSError:
+            return []
+        return list(dict.fromkeys(lines))
+
+
+class SnapshotPoller:
+    def __init__(
+        self,
+        fetch: Callable[[], DashboardSnapshot],
+        interval: float = 30.0,
+        max_age: float = 120.0,
+        store: SnapshotStore | None = None,
+        warm_max_age: float = 900.0,
+        leader_wait: float = 10.0,
+        on_install: Callable[[DashboardSnapshot], None] | None = None,
+    ) -> None:
+        self.fetch = fetch
+        self.interval = interval
+        self.max_age = max_age
+        self.store = store
+        self.warm_max_age = warm_max_age
+        self.leader_wait = leader_wait
+        self.on_install = on_install
+        self._snapshot: DashboardSnapshot | None = None
+        self._warm: DashboardSnapshot | None = None
+        self._warm_checked = False
+        self._version = 0
+        self._changed = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="dashboard-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def current(self) -> DashboardSnapshot:
+        snapshot = self._snapshot or self._load_warm()
+        max_age = self.max_age
+        if snapshot is not None and snapshot is self._warm and self._polling:
+            max_age = self.warm_max_age
+        if snapshot is None or snapshot.age_seconds() > max_age:
+            return self.refresh(if_older_than=max_age)
+        return snapshot
+
+    def refresh(self, if_older_than: float | None = None) -> DashboardSnapshot:
+        leading = self.store is None or self.store.try_lead()
+        if not leading:
+            snapshot = self._snapshot
+            if _is_fresh(snapshot, if_older_than):
+                return snapshot
+            shared = self._wait_for_leader(snapshot, if_older_than)
+            if shared is not None:
+                return self._install(shared, newer_only=True)
+            if snapshot is not None:
+                return snapshot
+
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            if _is_fresh(snapshot, if_older_than):
+                return snapshot
+            fetched = self.fetch()
+            self._install(fetched)
+            if self.store is not None and leading:
+                try:
+                    self.store.publish(fetched)
+                except OSError:
+                    LOGGER.warning("Unable to publish snapshot to %s", self.store.path)
+            return fetched
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def wait_for_update(self, seen_version: int, timeout: float) -> int:
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != seen_version, timeout=timeout)
+            return self._version
+
+    @property
+    def _polling(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _install(self, snapshot: DashboardSnapshot, newer_only: bool = False) -> DashboardSnapshot:
+        with self._changed:
+            current = self._snapshot
+            if newer_only and current is not None and current.fetched_at >= snapshot.fetched_at:
+                return current
+            self._snapshot = snapshot
+            self._version += 1
+            self._changed.notify_all()
+        if self.on_install is not None:
+            self.on_install(snapshot)
+        return snapshot
+
+    def _load_warm(self) -> DashboardSnapshot | None:
+        if self.store is None or self._warm_checked:
+            return None
+        self._warm_checked = True
+        warm = self.store.read()
+        if warm is None or warm.age_seconds() > self.warm_max_age:
+            return None
+        with self._changed:
+            installed = self._version == 0 and self._snapshot is None
+            if installed:
+                self._snapshot = self._warm = warm
+            snapshot = self._snapshot
+        if installed and self.on_install is not None:
+            self.on_install(warm)
+        return snapshot
+
+    def _wait_for_leader(
+        self, current: DashboardSnapshot | None, max_age: float | None
+    ) -> DashboardSnapshot | None:
+        deadline = time.monotonic() + self.leader_wait
+        while True:
+            shared = self.store.read()
+            if shared is not None and (
+                shared.age_seconds() <= max_age
+                if max_age is not None
+                else current is None or shared.fetched_at > current.fetched_at
+            ):
+                return shared
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(SHARED_POLL_SECONDS)
+
+    def _follow(self) -> None:
+        shared = self.store.read()
+        if shared is not None:
+            self._install(shared, newer_only=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            leading = self.store is None or self.store.try_lead()
+            try:
+                if leading:
+                    self.refresh()
+                else:
+                    self._follow()
+            except Exception:
+                LOGGER.exception("Dashboard snapshot refresh failed")
+            self._stop.wait(self.interval if leading else min(self.interval, FOLLOW_SECONDS))
+
+
+def _is_fresh(snapshot: DashboardSnapshot | None, max_age: float | None) -> bool:
+    return snapshot is not None and max_age is not None and snapshot.age_seconds() <= max_age
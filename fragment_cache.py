@@ -0,0 +1,42 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from jinja2 import Template
+from markupsafe import Markup
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], Markup] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, name: str, template: Template, **context: Any) -> Markup:
+        key = (name, content_hash(context))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+
+        rendered = Markup(template.render(**context))
+        with self._lock:
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def content_hash(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
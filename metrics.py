@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+METRICS_DIR = os.getenv("METRICS_DIR", "").strip()
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(
+        self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: tuple[str, ...]
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args: Any, merge: str = "max") -> None:
+        super().__init__(*args)
+        self.merge = merge
+
+    def set(self, value: float, **labels: str) -> None:
+        with self.registry.lock:
+            self.values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class MetricsRegistry:
+    def __init__(
+        self, directory: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_SECONDS
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.metrics: dict[str, _Metric] = {}
+        self._flushed_at = 0.0
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), merge: str = "max"
+    ) -> Gauge:
+        return self._register(Gauge(self, name, help_text, labelnames, merge=merge))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labelnames, buckets=buckets))
+
+    def maybe_flush(self) -> None:
+        if self.directory is None:
+            return
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            self._flushed_at = time.monotonic()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{os.getpid()}.json"
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._dump()))
+            os.replace(tmp_path, path)
+
+    def collect(self) -> dict[str, dict[tuple[str, ...], Any]]:
+        if self.directory is None:
+            return self._dump_values()
+        self.flush()
+        merged: dict[str, dict[tuple[str, ...], Any]] = {name: {} for name in self.metrics}
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                dump = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(int(path.stem)) if path.stem.isdigit() else False
+            for name, samples in dump.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                for labels, value in samples:
+                    _merge_sample(metric, merged[name], tuple(labels), value)
+        return merged
+
+    def render(self, values: dict[str, dict[tuple[str, ...], Any]] | None = None) -> str:
+        values = self.collect() if values is None else values
+        lines: list[str] = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(values.get(name, {}).items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value):
+                        cumulative += count
+                        bucket = _labels({**labels, "le": f"{bound:g}"})
+                        lines.append(f"{name}_bucket{bucket} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {value[-1]}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value[-2]:g}")
+                    lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric) -> Any:
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def _dump_values(self) -> dict[str, dict[tuple[str, ...], Any]]:
+        with self.lock:
+            return {
+                name: {
+                    key: list(value) if isinstance(value, list) else value
+                    for key, value in metric.values.items()
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def _dump(self) -> dict[str, list[list[Any]]]:
+        return {
+            name: [[list(key), value] for key, value in samples.items()]
+            for name, samples in self._dump_values().items()
+        }
+
+
+def _merge_sample(
+    metric: _Metric, merged: dict[tuple[str, ...], Any], key: tuple[str, ...], value: Any
+) -> None:
+    current = merged.get(key)
+    if current is None:
+        merged[key] = list(value) if isinstance(value, list) else value
+    elif metric.kind == "histogram":
+        merged[key] = [left + right for left, right in zip(current, value)]
+    elif metric.kind == "gauge" and metric.merge == "max":
+        merged[key] = max(current, value)
+    elif metric.kind == "gauge" and metric.merge == "min":
+        merged[key] = min(current, value)
+    else:
+        merged[key] = current + value
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,57 @@
+import re
+from dataclasses import dataclass
+
+# Sentences glued together upstream ("moved.Stop now") get a space back.
+_GLUED_SENTENCE = re.compile(r"(?<=[.!?])(?=[A-Z])")
+# One pass finds sentence ends and the first EN/FR/NL "from <date>" phrase. The
+# leading lookahead lets the engine skip positions that cannot start either branch.
+_SCAN = re.compile(
+    r"(?=[.!?fdvàam])(?:"
+    r"(?P<sentence_end>[.!?] )"
+    r"|\b(?:from|d[eè]s(?:\s+le)?|à\s+partir\s+du?|a\s+partir\s+du?|vanaf|met\s+ingang\s+van)"
+    r"\s+(?P<date>\d{1,2}\s+[^\W\d_]+|\d{1,2}(?:/\d{1,2})?)\b"
+    r")",
+    re.IGNORECASE,
+)
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class ProcessedNoticeText:
+    text: str
+    sentence_ends: tuple[int, ...]
+    headline_key: str
+    linked_date: str | None
+
+    @property
+    def sentences(self) -> list[str]:
+        starts = (0, *(end + 1 for end in self.sentence_ends))
+        ends = (*self.sentence_ends, len(self.text))
+        return [self.text[start:end] for start, end in zip(starts, ends) if start < end]
+
+
+class NoticeTextProcessor:
+    def process(self, raw_text: str) -> ProcessedNoticeText:
+        text = self.clean(raw_text)
+
+        sentence_ends: list[int] = []
+        linked_date: str | None = None
+        for match in _SCAN.finditer(text):
+            if match.lastgroup == "sentence_end":
+                sentence_ends.append(match.start() + 1)
+            elif linked_date is None:
+                linked_date = match.group("date")
+
+        headline = text[: sentence_ends[1]] if len(sentence_ends) > 1 else text
+        return ProcessedNoticeText(
+            text=text,
+            sentence_ends=tuple(sentence_ends),
+            headline_key=_NON_ALPHANUMERIC.sub(" ", headline.lower()).strip(),
+            linked_date=linked_date,
+        )
+
+    def clean(self, raw_text: str) -> str:
+        return _GLUED_SENTENCE.sub(" ", " ".join(raw_text.split()))
+
+
+NOTICE_TEXT = NoticeTextProcessor()
@@ -1,16 +1,71 @@
+import hashlib
 import json
 import logging
 import os
-import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable
 from zoneinfo import ZoneInfo
 
-import requests
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import REGISTRY
+from notice_text import NOTICE_TEXT, ProcessedNoticeText
+from tracing import bind, span
+
+if TYPE_CHECKING:
+    import requests
 
 LOGGER = logging.getLogger(__name__)
 BRUSSELS = ZoneInfo("Europe/Brussels")
+LEGACY_WAITING_TIMES_URL = (
+    "https://stibmivb.opendatasoft.com/api/explore/v2.1/catalog/datasets/"
+    "waiting-time-rt-production/records"
+)
+CACHE_TTLS = {
+    "/rt/WaitingTimes": 20.0,
+    "/rt/TravellersInformation": 120.0,
+    LEGACY_WAITING_TIMES_URL: 20.0,
+}
+CACHE_STALE_SECONDS = 300.0
+CACHE_MAX_ENTRIES = 256
+NOTICE_MEMO_MAX_ENTRIES = 2048
+HTTP_POOL_SIZE = int(os.getenv("STIB_HTTP_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("STIB_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("STIB_READ_TIMEOUT", "10"))
+WAITING_TIMES_PAGE_SIZE = 100
+WAITING_TIMES_MAX_PAGES = 10
+WAITING_TIMES_ORDER_BY = "lineid,pointid"
+HEDGE_AFTER_SECONDS = float(os.getenv("STIB_HEDGE_AFTER_SECONDS", "2"))
+HEDGE_TO_LEGACY = os.getenv("STIB_HEDGE_TO_LEGACY", "").strip().lower() in {"1", "true", "yes"}
+LAST_GOOD_MAX_SECONDS = float(os.getenv("STIB_LAST_GOOD_MAX_SECONDS", "900"))
+COALESCE_WAIT_SECONDS = float(os.getenv("STIB_COALESCE_WAIT_SECONDS", "15"))
+
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "stib_upstream_request_seconds", "Upstream HTTP request latency.", ("path", "source")
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "stib_upstream_errors_total", "Failed upstream requests by kind.", ("path", "source", "kind")
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "stib_upstream_hedges_total", "Hedged second requests sent.", ("path",)
+)
+UPSTREAM_COALESCED = REGISTRY.counter(
+    "stib_upstream_coalesced_total",
+    "Fetches that joined an identical request already in flight.",
+    ("path",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "stib_cache_requests_total", "Response cache lookups by result.", ("path", "result")
+)
+NORMALIZE_SECONDS = REGISTRY.histogram(
+    "stib_normalize_seconds", "Time spent normalizing upstream records.", ("kind",)
+)
 
 
 @dataclass(frozen=True)
@@ -21,6 +76,260 @@ class StopConfig:
     static_id: str = ""
 
 
+@dataclass(frozen=True, slots=True)
+class Departure:
+    pointid: str
+    destination: str
+    arrival: datetime
+    lineid: str = ""
+
+    @property
+    def time_local(self) -> str:
+        return self.arrival.strftime("%H:%M")
+
+    @property
+    def expected_at(self) -> str:
+        return self.arrival.isoformat()
+
+    @property
+    def minutes_until(self) -> int:
+        return self.minutes_until_at(datetime.now(BRUSSELS))
+
+    def minutes_until_at(self, now: datetime) -> int:
+        return int((self.arrival - now).total_seconds() // 60)
+
+    def to_dict(self, now: datetime | None = None) -> dict[str, Any]:
+        return {
+            "pointid": self.pointid,
+            "destination": self.destination,
+            "time_local": self.time_local,
+            "expected_at": self.expected_at,
+            "minutes_until": self.minutes_until_at(now or datetime.now(BRUSSELS)),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Notice:
+    text: str
+    priority: int
+    lines: tuple[str, ...]
+    points: tuple[str, ...]
+    relevance: int
+    linked_date: str | None = None
+
+    @property
+    def priority_label(self) -> str:
+        return _priority_label(self.priority)
+
+    @property
+    def priority_tone(self) -> str:
+        return _priority_tone(self.priority)
+
+    @property
+    def scope_label(self) -> str:
+        return _scope_label(list(self.lines), self.relevance)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "text": self.text,
+            "priority": self.priority,
+            "priority_label": self.priority_label,
+            "priority_tone": self.priority_tone,
+            "lines": list(self.lines),
+            "points": list(self.points),
+            "relevance": self.relevance,
+            "scope_label": self.scope_label,
+            "linked_date": self.linked_date,
+        }
+
+
+@dataclass
+class _CacheEntry:
+    value: dict[str, Any]
+    stored_at: float
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = 30.0,
+        stale_seconds: float = CACHE_STALE_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+        spawn: Callable[[Callable[[], None]], None] | None = None,
+    ) -> None:
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._spawn = spawn
+        self._entries: OrderedDict[tuple[Any, ...], _CacheEntry] = OrderedDict()
+        self._revalidating: set[tuple[Any, ...]] = set()
+        self._lock = threading.Lock()
+
+    def get_or_fetch(
+        self,
+        key: tuple[Any, ...],
+        path: str,
+        fetch: Callable[[], dict[str, Any]],
+        max_stale: float | None = None,
+    ) -> dict[str, Any]:
+        value = self.lookup(
+            key,
+            path,
+            lambda: (self._spawn or _spawn_daemon)(lambda: self._revalidate(key, fetch)),
+            max_stale,
+        )
+        if value is not None:
+            return value
+        value = fetch()
+        self.store(key, value)
+        return value
+
+    def lookup(
+        self,
+        key: tuple[Any, ...],
+        path: str,
+        revalidate: Callable[[], None],
+        max_stale: float | None = None,
+    ) -> dict[str, Any] | None:
+        ttl = self.ttls.get(path, self.default_ttl)
+        stale_seconds = self.stale_seconds if max_stale is None else max_stale
+        value = None
+        start_revalidation = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = self._clock() - entry.stored_at
+                if age < ttl:
+                    value = entry.value
+                    result = "hit"
+                elif age < ttl + stale_seconds:
+                    value = entry.value
+                    result = "stale"
+                    start_revalidation = key not in self._revalidating
+                    if start_revalidation:
+                        self._revalidating.add(key)
+
+        if value is None:
+            result = "miss"
+        CACHE_REQUESTS.inc(path=_metric_path(path), result=result)
+        if start_revalidation:
+            revalidate()
+        return value
+
+    def store(self, key: tuple[Any, ...], value: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = _CacheEntry(value=value, stored_at=self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._revalidating.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def finish_revalidation(self, key: tuple[Any, ...]) -> None:
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def _revalidate(self, key: tuple[Any, ...], fetch: Callable[[], dict[str, Any]]) -> None:
+        try:
+            self.store(key, fetch())
+        except Exception:
+            LOGGER.exception("Background refresh failed for %s; keeping stale entry", key[0])
+        finally:
+            self.finish_revalidation(key)
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+class _NoticeRecord:
+    __slots__ = ("lines", "priority", "_raw_content", "_raw_points", "_points", "_text")
+
+    def __init__(self, record: dict[str, Any]) -> None:
+        self.lines = tuple(line.get("id", "") for line in _load_embedded_json(record.get("lines")))
+        self.priority = int(record.get("priority") or 0)
+        self._raw_content = record.get("content")
+        self._raw_points = record.get("points")
+        self._points: tuple[str, ...] | None = None
+        self._text: ProcessedNoticeText | None = None
+
+    @property
+    def points(self) -> tuple[str, ...]:
+        if self._points is None:
+            self._points = tuple(
+                point.get("id", "") for point in _load_embedded_json(self._raw_points)
+            )
+        return self._points
+
+    @property
+    def text(self) -> ProcessedNoticeText:
+        if self._text is None:
+            self._text = NOTICE_TEXT.process(_extract_notice_text(self._raw_content))
+        return self._text
+
+
+class NoticeRecordMemo:
+    def __init__(self, max_entries: int = NOTICE_MEMO_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Any, _NoticeRecord] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, record: dict[str, Any]) -> _NoticeRecord:
+        key = _notice_record_key(record)
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                return parsed
+
+        parsed = _NoticeRecord(record)
+        with self._lock:
+            self._entries[key] = parsed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return parsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+NOTICE_RECORD_MEMO = NoticeRecordMemo()
+
+
+@dataclass(frozen=True)
+class _Validated:
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    payload: dict[str, Any]
+
+
+def build_session(pool_size: int = HTTP_POOL_SIZE) -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
 class StibClient:
     def __init__(
         self,
@@ -28,8 +337,11 @@ class StibClient:
         base_url: str | None = None,
         subscription_key: str | None = None,
         legacy_api_key: str | None = None,
-        session: requests.Session | None = None,
-        timeout: int = 10,
+        session: "requests.Session | None" = None,
+        timeout: float | tuple[float, float] | None = None,
+        cache: ResponseCache | None = RESPONSE_CACHE,
+        hedge_after: float = HEDGE_AFTER_SECONDS,
+        hedge_to_legacy: bool = HEDGE_TO_LEGACY,
     ) -> None:
         self.source = (source or os.getenv("STIB_DATA_SOURCE") or "belgian_mobility").strip()
         self.base_url = (
@@ -46,87 +358,315 @@ class StibClient:
         self.legacy_api_key = (
             legacy_api_key if legacy_api_key is not None else os.getenv("STIB_API_KEY", "").strip()
         )
-        self.timeout = timeout
-        self.session = session or requests.Session()
+        self.timeout = timeout if timeout is not None else (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self._session = session
+        self.cache = cache
+        self.hedge_after = hedge_after
+        self.hedge_to_legacy = hedge_to_legacy
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._last_good: OrderedDict[tuple[Any, ...], tuple[datetime, Any]] = OrderedDict()
+        self._validators: OrderedDict[tuple[Any, ...], _Validated] = OrderedDict()
+        self._notice_memo: dict[tuple[Any, ...], tuple[dict[str, Any], list[Notice]]] = {}
+        self._memo_lock = threading.Lock()
+        self._in_flight: dict[tuple[Any, ...], Future[dict[str, Any]]] = {}
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            self._session = build_session()
+        return self._session
 
     def get_departures_for_stops(
         self, line_id: str, stops: list[StopConfig]
-    ) -> tuple[dict[str, list[dict[str, Any]]], str | None]:
-        empty = {stop.pointid: [] for stop in stops}
-
+    ) -> tuple[dict[str, list[Departure]], str | None]:
+        key = ("stops", line_id, tuple(stops))
         try:
-            if self.source == "legacy":
-                return self._get_legacy_departures_for_stops(line_id, stops), None
-
             records = self._request_json(
-                "/rt/WaitingTimes",
+                LEGACY_WAITING_TIMES_URL if self.source == "legacy" else "/rt/WaitingTimes",
                 params={
                     "select": "pointid,lineid,passingtimes",
                     "where": f'lineid="{line_id}"',
                     "limit": 100,
                 },
             ).get("results", [])
-
-            return self._normalize_departure_records(records, stops), None
+            with _normalizing("departures"):
+                departures = self._normalize_departure_records(records, stops)
+            return self._remember(key, departures), None
+        except Exception as exc:
+            _log_upstream_failure(exc, "Unable to load departures from %s", self.source)
+            return self._last_known_good(
+                key,
+                {stop.pointid: [] for stop in stops},
+                "Departures are temporarily unavailable.",
+            )
+
+    def get_line_departures(
+        self, line_stops: dict[str, list[StopConfig]], max_stale: float | None = None
+    ) -> tuple[dict[str, dict[str, list[Departure]]], str | None]:
+        key = ("lines", _freeze_line_stops(line_stops))
+        try:
+            records = self._request_paged_results(
+                LEGACY_WAITING_TIMES_URL if self.source == "legacy" else "/rt/WaitingTimes",
+                params={
+                    "select": "pointid,lineid,passingtimes",
+                    "where": " OR ".join(f'lineid="{line_id}"' for line_id in line_stops),
+                },
+                max_stale=max_stale,
+            )
+            with _normalizing("departures"):
+                departures = self._index_line_departure_records(records, line_stops)
+            return self._remember(key, departures), None
         except Exception as exc:
-            LOGGER.exception("Unable to load departures from %s", self.source)
-            return empty, "Departures are temporarily unavailable."
+            _log_upstream_failure(exc, "Unable to load line-wide departures from %s", self.source)
+            return self._last_known_good(
+                key, _empty_line_departures(line_stops), "Departures are temporarily unavailable."
+            )
 
     def get_traveller_notices(
         self, monitored_lines: list[str], stops: list[StopConfig]
-    ) -> tuple[list[dict[str, Any]], str | None]:
+    ) -> tuple[list[Notice], str | None]:
+        notices, error = self.get_traveller_notices_by_view({"": (monitored_lines, stops)})
+        return notices[""], error
+
+    def get_traveller_notices_by_view(
+        self, views: dict[str, tuple[list[str], list[StopConfig]]], max_stale: float | None = None
+    ) -> tuple[dict[str, list[Notice]], str | None]:
+        key = (
+            "notices",
+            tuple((view, tuple(lines), tuple(stops)) for view, (lines, stops) in views.items()),
+        )
         try:
-            records = self._request_json(
-                "/rt/TravellersInformation",
-                params={"limit": 254},
-            ).get("results", [])
-            return self._normalize_traveller_notices(records, monitored_lines, stops), None
-        except Exception:
-            LOGGER.exception("Unable to load traveller notices")
-            return [], "Traveller notices are temporarily unavailable."
-
-    def _request_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        headers = {"Accept": "application/json"}
-        if self.subscription_key:
-            headers["Ocp-Apim-Subscription-Key"] = self.subscription_key
-
-        response = self.session.get(
-            f"{self.base_url}{path}",
-            params=params,
-            headers=headers,
-            timeout=self.timeout,
+            payload = self._request_json(
+                "/rt/TravellersInformation", params={"limit": 254}, max_stale=max_stale
+            )
+            notices = {
+                view: self._notices_from_payload(payload, monitored_lines, stops)
+                for view, (monitored_lines, stops) in views.items()
+            }
+            return self._remember(key, notices), None
+        except Exception as exc:
+            _log_upstream_failure(exc, "Unable to load traveller notices")
+            return self._last_known_good(
+                key, {view: [] for view in views}, "Traveller notices are temporarily unavailable."
+            )
+
+    def _notices_from_payload(
+        self, payload: dict[str, Any], monitored_lines: list[str], stops: list[StopConfig]
+    ) -> list[Notice]:
+        memo_key = (tuple(monitored_lines), tuple(stops))
+        memo = self._notice_memo.get(memo_key)
+        if memo is not None and memo[0] is payload:
+            return list(memo[1])
+
+        with _normalizing("notices"):
+            notices = self._normalize_traveller_notices(
+                payload.get("results", []), monitored_lines, stops
+            )
+        with self._memo_lock:
+            self._notice_memo[memo_key] = (payload, notices)
+        return list(notices)
+
+    def _request_json(
+        self, path: str, params: dict[str, Any] | None = None, max_stale: float | None = None
+    ) -> dict[str, Any]:
+        if self.cache is None:
+            return self._coalesced_fetch(path, params)
+
+        key = (path, _freeze_params(params), self.source)
+        return self.cache.get_or_fetch(
+            key, path, lambda: self._coalesced_fetch(path, params), max_stale
         )
-        response.raise_for_status()
-        return response.json()
 
-    def _get_legacy_departures_for_stops(
-        self, line_id: str, stops: list[StopConfig]
-    ) -> dict[str, list[dict[str, Any]]]:
-        departures_by_stop = {stop.pointid: [] for stop in stops}
-        legacy_url = (
-            "https://stibmivb.opendatasoft.com/api/explore/v2.1/catalog/datasets/"
-            "waiting-time-rt-production/records"
+    def _coalesced_fetch(self, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        key = (path, _freeze_params(params), self.source)
+        with self._in_flight_lock:
+            flight = self._in_flight.get(key)
+            leading = flight is None
+            if leading:
+                flight = self._in_flight[key] = Future()
+        if not leading:
+            UPSTREAM_COALESCED.inc(path=_metric_path(path))
+            with span("coalesced", _metric_path(path)):
+                return flight.result(timeout=COALESCE_WAIT_SECONDS)
+
+        try:
+            value = self._guarded_fetch(path, params)
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def _guarded_fetch(self, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        breaker = self.breakers.get(path)
+        if breaker is None:
+            breaker = self.breakers.setdefault(path, CircuitBreaker(path))
+        try:
+            return breaker.call(lambda: self._hedged_fetch(path, params))
+        except CircuitOpenError:
+            UPSTREAM_ERRORS.inc(
+                path=_metric_path(path), source=_metric_source(path), kind="circuit_open"
+            )
+            raise
+
+    def _hedged_fetch(self, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        if self.hedge_after <= 0:
+            return self._fetch_json(path, params)
+
+        primary = HEDGE_POOL.submit(bind(self._fetch_json), path, params)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        UPSTREAM_HEDGES.inc(path=_metric_path(path))
+        if self.hedge_to_legacy and path == "/rt/WaitingTimes":
+            hedge = HEDGE_POOL.submit(bind(self._fetch_json), LEGACY_WAITING_TIMES_URL, params)
+        else:
+            hedge = HEDGE_POOL.submit(bind(self._fetch_json), path, params)
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _remember(self, key: tuple[Any, ...], result: Any) -> Any:
+        with self._memo_lock:
+            self._last_good[key] = (datetime.now(BRUSSELS), result)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > CACHE_MAX_ENTRIES:
+                self._last_good.popitem(last=False)
+        return result
+
+    def _last_known_good(self, key: tuple[Any, ...], empty: Any, message: str) -> tuple[Any, str]:
+        remembered = self._last_good.get(key)
+        if remembered is None:
+            return empty, message
+        stored_at, result = remembered
+        if (datetime.now(BRUSSELS) - stored_at).total_seconds() > LAST_GOOD_MAX_SECONDS:
+            return empty, message
+        return result, f"{message} Showing data from {stored_at:%H:%M:%S}."
+
+    def _request_paged_results(
+        self,
+        path: str,
+        params: dict[str, Any],
+        page_size: int = WAITING_TIMES_PAGE_SIZE,
+        max_stale: float | None = None,
+    ) -> list[dict[str, Any]]:
+        params = {**params, "order_by": WAITING_TIMES_ORDER_BY}
+        if self.cache is None:
+            return self._fetch_pages(path, params, page_size)["results"]
+
+        key = (path, _freeze_params({**params, "limit": page_size}), self.source)
+        payload = self.cache.get_or_fetch(
+            key, path, lambda: self._fetch_pages(path, params, page_size), max_stale
         )
+        return payload["results"]
+
+    def _fetch_pages(self, path: str, params: dict[str, Any], page_size: int) -> dict[str, Any]:
+        records: list[dict[str, Any]] = []
+        for page in range(WAITING_TIMES_MAX_PAGES):
+            payload = self._coalesced_fetch(
+                path, {**params, "limit": page_size, "offset": page * page_size}
+            )
+            page_results = payload.get("results", [])
+            records.extend(page_results)
+            if _is_last_page(payload, page_results, len(records), page_size):
+                break
+        return {"results": _unique_waiting_time_records(records)}
 
-        for stop in stops:
-            params = {
-                "where": f'lineid="{line_id}" AND pointid="{stop.pointid}"',
-                "limit": 100,
-            }
-            if self.legacy_api_key:
-                params["apikey"] = self.legacy_api_key
+    def _fetch_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        import requests
 
-            response = self.session.get(legacy_url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            payload = response.json()
-            normalized = self._normalize_departure_records(payload.get("results", []), [stop])
-            departures_by_stop[stop.pointid] = normalized.get(stop.pointid, [])
+        key, url, params, headers, validated = self._prepare_request(path, params)
+        labels = {"path": _metric_path(path), "source": _metric_source(path)}
+        started = time.perf_counter()
+        try:
+            with span("upstream", labels["path"]):
+                response = self.session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+        except requests.Timeout:
+            UPSTREAM_ERRORS.inc(kind="timeout", **labels)
+            raise
+        except requests.RequestException:
+            UPSTREAM_ERRORS.inc(kind="connection", **labels)
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, **labels)
+        if response.status_code == 304 and validated is not None:
+            return validated.payload
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc(kind="http", **labels)
+        response.raise_for_status()
+        return self._accept_payload(key, validated, response.headers, response.content, labels)
 
-        return departures_by_stop
+    def _prepare_request(
+        self, path: str, params: dict[str, Any] | None
+    ) -> tuple[tuple[Any, ...], str, dict[str, Any] | None, dict[str, str], _Validated | None]:
+        key = (path, _freeze_params(params))
+        headers = {"Accept": "application/json"}
+        if path == LEGACY_WAITING_TIMES_URL:
+            url = path
+            if self.legacy_api_key:
+                params = {**(params or {}), "apikey": self.legacy_api_key}
+        else:
+            url = f"{self.base_url}{path}"
+            if self.subscription_key:
+                headers["Ocp-Apim-Subscription-Key"] = self.subscription_key
+
+        validated = self._validators.get(key)
+        if validated is not None:
+            if validated.etag:
+                headers["If-None-Match"] = validated.etag
+            if validated.last_modified:
+                headers["If-Modified-Since"] = validated.last_modified
+        return key, url, params, headers, validated
+
+    def _accept_payload(
+        self,
+        key: tuple[Any, ...],
+        validated: _Validated | None,
+        headers: Any,
+        content: bytes,
+        labels: dict[str, str],
+    ) -> dict[str, Any]:
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if validated is not None and validated.digest == digest:
+            payload = validated.payload
+        else:
+            try:
+                payload = _json_loads(content)
+            except _JSON_DECODE_ERRORS:
+                UPSTREAM_ERRORS.inc(kind="decode", **labels)
+                raise
+        with self._memo_lock:
+            self._validators[key] = _Validated(
+                etag=headers.get("ETag"),
+                last_modified=headers.get("Last-Modified"),
+                digest=digest,
+                payload=payload,
+            )
+            self._validators.move_to_end(key)
+            while len(self._validators) > CACHE_MAX_ENTRIES:
+                self._validators.popitem(last=False)
+        return payload
 
     def _normalize_departure_records(
         self, records: list[dict[str, Any]], stops: list[StopConfig]
-    ) -> dict[str, list[dict[str, Any]]]:
+    ) -> dict[str, list[Departure]]:
         departures_by_stop = {stop.pointid: [] for stop in stops}
         known_pointids = set(departures_by_stop)
         now = datetime.now(BRUSSELS)
@@ -136,6 +676,7 @@ class StibClient:
             if pointid not in known_pointids:
                 continue
 
+            line_id = str(record.get("lineid", ""))
             passages = _load_embedded_json(record.get("passingtimes"))
             for passage in passages:
                 arrival = _parse_iso_datetime(passage.get("expectedArrivalTime"))
@@ -143,54 +684,73 @@ class StibClient:
                     continue
 
                 arrival_local = arrival.astimezone(BRUSSELS)
-                minutes = int((arrival_local - now).total_seconds() // 60)
-                if minutes < 0:
+                if arrival_local < now:
                     continue
 
                 destination = _pick_localized_text(passage.get("destination") or {})
                 departures_by_stop[pointid].append(
-                    {
-                        "pointid": pointid,
-                        "destination": destination or "?",
-                        "time_local": arrival_local.strftime("%H:%M"),
-                        "minutes_until": minutes,
-                    }
+                    Departure(
+                        pointid=pointid,
+                        destination=destination or "?",
+                        arrival=arrival_local,
+                        lineid=line_id,
+                    )
                 )
 
         for pointid, departures in departures_by_stop.items():
-            departures.sort(key=lambda departure: departure["minutes_until"])
+            departures.sort(key=lambda departure: departure.arrival)
 
         return departures_by_stop
 
+    def _index_line_departure_records(
+        self, records: list[dict[str, Any]], line_stops: dict[str, list[StopConfig]]
+    ) -> dict[str, dict[str, list[Departure]]]:
+        records_by_line: dict[str, list[dict[str, Any]]] = {line_id: [] for line_id in line_stops}
+        for record in records:
+            line_id = str(record.get("lineid", ""))
+            if line_id in records_by_line:
+                records_by_line[line_id].append(record)
+
+        index = {}
+        for line_id, stops in line_stops.items():
+            line_records = records_by_line[line_id]
+            configured = {stop.pointid for stop in stops}
+            seen = sorted({str(record.get("pointid", "")) for record in line_records} - configured)
+            extra_stops = [
+                StopConfig(label="", pointid=pointid, destination="") for pointid in seen if pointid
+            ]
+            index[line_id] = self._normalize_departure_records(line_records, [*stops, *extra_stops])
+        return index
+
     def _normalize_traveller_notices(
         self, records: list[dict[str, Any]], monitored_lines: list[str], stops: list[StopConfig]
-    ) -> list[dict[str, Any]]:
+    ) -> list[Notice]:
         allowed_lines = set(monitored_lines)
         point_ids = {stop.pointid for stop in stops}
         static_ids = {stop.static_id for stop in stops if stop.static_id}
-        relevant_notices: list[dict[str, Any]] = []
-        fallback_notices: list[dict[str, Any]] = []
+        relevant_notices: list[Notice] = []
+        fallback_notices: list[Notice] = []
         seen_notice_keys: set[str] = set()
 
         for record in records:
-            text = _clean_notice_text(_extract_notice_text(record.get("content")))
-            if not text:
+            parsed = NOTICE_RECORD_MEMO.get_or_parse(record)
+            priority = parsed.priority
+            if priority < 5:
                 continue
-            if not _is_actionable_notice(text):
+            matched_lines = [line for line in parsed.lines if line in allowed_lines]
+            if not matched_lines:
                 continue
 
-            lines = [line.get("id", "") for line in _load_embedded_json(record.get("lines"))]
-            points = [point.get("id", "") for point in _load_embedded_json(record.get("points"))]
-            priority = int(record.get("priority") or 0)
-            if priority < 5:
+            text = parsed.text.text
+            if not text:
                 continue
-            matched_lines = [line for line in lines if line in allowed_lines]
-            if not matched_lines:
+            if not _is_actionable_notice(text):
                 continue
-            notice_key = _notice_validation_key(text, matched_lines)
+            notice_key = f"{','.join(sorted(matched_lines))}:{parsed.text.headline_key}"
             if notice_key in seen_notice_keys:
                 continue
 
+            points = parsed.points
             line_match = bool(matched_lines)
             point_match = bool(point_ids.intersection(points) or static_ids.intersection(points))
             relevance = 0
@@ -199,17 +759,14 @@ class StibClient:
             if point_match:
                 relevance += 2
 
-            notice = {
-                "text": text,
-                "priority": priority,
-                "priority_label": _priority_label(priority),
-                "priority_tone": _priority_tone(priority),
-                "lines": matched_lines,
-                "points": [point for point in points if point],
-                "relevance": relevance,
-                "scope_label": _scope_label(matched_lines, relevance),
-                "linked_date": _extract_notice_linked_date(text),
-            }
+            notice = Notice(
+                text=text,
+                priority=priority,
+                lines=tuple(matched_lines),
+                points=tuple(point for point in points if point),
+                relevance=relevance,
+                linked_date=parsed.text.linked_date,
+            )
 
             seen_notice_keys.add(notice_key)
             if relevance:
@@ -217,21 +774,134 @@ class StibClient:
             else:
                 fallback_notices.append(notice)
 
-        relevant_notices.sort(key=lambda item: (-item["relevance"], -item["priority"], item["text"]))
-        fallback_notices.sort(key=lambda item: (-item["priority"], item["text"]))
+        relevant_notices.sort(key=lambda item: (-item.relevance, -item.priority, item.text))
+        fallback_notices.sort(key=lambda item: (-item.priority, item.text))
 
         selected = relevant_notices if relevant_notices else fallback_notices
         return selected[:6]
 
 
+HEDGE_POOL = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="stib-hedge")
+_SHARED_CLIENT: tuple[int, StibClient] | None = None
+_SHARED_CLIENT_LOCK = threading.Lock()
+
+
+def _load_json_decoder(
+    preferred: str = "auto",
+) -> tuple[str, Callable[[bytes | str], Any], tuple[type[Exception], ...]]:
+    candidates = ("orjson", "msgspec", "json") if preferred == "auto" else (preferred, "json")
+    for candidate in candidates:
+        if candidate == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return "orjson", orjson.loads, (orjson.JSONDecodeError,)
+        if candidate == "msgspec":
+            try:
+                import msgspec.json
+            except ImportError:
+                continue
+            return "msgspec", msgspec.json.decode, (msgspec.DecodeError,)
+        if candidate == "json":
+            return "json", json.loads, (json.JSONDecodeError,)
+    raise ValueError(f"Unknown JSON decoder {preferred!r}")
+
+
+JSON_DECODER, _json_loads, _JSON_DECODE_ERRORS = _load_json_decoder(
+    os.getenv("STIB_JSON_DECODER", "auto")
+)
+
+
+def get_shared_client() -> StibClient:
+    global _SHARED_CLIENT
+
+    shared = _SHARED_CLIENT
+    if shared is not None and shared[0] == os.getpid():
+        return shared[1]
+    with _SHARED_CLIENT_LOCK:
+        if _SHARED_CLIENT is None or _SHARED_CLIENT[0] != os.getpid():
+            _SHARED_CLIENT = (os.getpid(), StibClient())
+        return _SHARED_CLIENT[1]
+
+
+def _freeze_params(params: dict[str, Any] | None) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+
+
+def _is_last_page(
+    payload: dict[str, Any], page_results: list[Any], fetched: int, page_size: int
+) -> bool:
+    total_count = payload.get("total_count")
+    return len(page_results) < page_size or (
+        total_count is not None and fetched >= int(total_count)
+    )
+
+
+def _unique_waiting_time_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    unique: dict[tuple[str, str], dict[str, Any]] = {}
+    for record in records:
+        unique.setdefault((str(record.get("lineid")), str(record.get("pointid"))), record)
+    return list(unique.values())
+
+
+def _metric_path(path: str) -> str:
+    return "/rt/WaitingTimes" if path == LEGACY_WAITING_TIMES_URL else path
+
+
+def _metric_source(path: str) -> str:
+    return "legacy" if path == LEGACY_WAITING_TIMES_URL else "belgian_mobility"
+
+
+def _freeze_line_stops(line_stops: dict[str, list[StopConfig]]) -> tuple[Any, ...]:
+    return tuple((line_id, tuple(stops)) for line_id, stops in line_stops.items())
+
+
+def _empty_line_departures(
+    line_stops: dict[str, list[StopConfig]],
+) -> dict[str, dict[str, list[Departure]]]:
+    return {line_id: {stop.pointid: [] for stop in stops} for line_id, stops in line_stops.items()}
+
+
+def _log_upstream_failure(exc: Exception, message: str, *args: Any) -> None:
+    if isinstance(exc, CircuitOpenError):
+        LOGGER.warning(f"{message}: %s", *args, exc)
+    else:
+        LOGGER.exception(message, *args)
+
+
+@contextmanager
+def _normalizing(kind: str) -> Iterator[None]:
+    with NORMALIZE_SECONDS.time(kind=kind), span("normalize", kind):
+        yield
+
+
+def _spawn_daemon(target: Callable[[], None]) -> None:
+    threading.Thread(target=target, name="stib-cache-refresh", daemon=True).start()
+
+
+def _notice_record_key(record: dict[str, Any]) -> Any:
+    fields = (
+        record.get("content"),
+        record.get("lines"),
+        record.get("points"),
+        record.get("priority"),
+    )
+    try:
+        hash(fields)
+    except TypeError:
+        return json.dumps(fields, sort_keys=True, default=str)
+    return fields
+
+
 def _load_embedded_json(raw_value: Any) -> list[dict[str, Any]]:
     if not raw_value:
         return []
     if isinstance(raw_value, list):
         return raw_value
     try:
-        loaded = json.loads(raw_value)
-    except (TypeError, json.JSONDecodeError):
+        loaded = _json_loads(raw_value)
+    except (TypeError, ValueError, *_JSON_DECODE_ERRORS):
         return []
     return loaded if isinstance(loaded, list) else []
 
@@ -267,12 +937,6 @@ def _extract_notice_text(raw_content: Any) -> str:
     return " ".join(chunks).strip()
 
 
-def _clean_notice_text(text: str) -> str:
-    cleaned = re.sub(r"(?<=[.!?])(?=[A-Z])", " ", text)
-    cleaned = re.sub(r"\s+", " ", cleaned)
-    return cleaned.strip()
-
-
 def _is_actionable_notice(text: str) -> bool:
     lowered = text.strip().lower()
     ignored_prefixes = (
@@ -291,26 +955,6 @@ def _scope_label(matched_lines: list[str], relevance: int) -> str:
     return "Monitored lines"
 
 
-def _extract_notice_linked_date(text: str) -> str | None:
-    patterns = (
-        r"\b(?:from|From)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
-        r"\b(?:d[eè]s(?:\s+le)?|D[eè]s(?:\s+le)?)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
-        r"\b(?:vanaf|Vanaf)\s+(\d{1,2}\s+[A-Za-z]+|\d{1,2}(?:/\d{1,2})?)\b",
-    )
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return match.group(1)
-    return None
-
-
-def _notice_validation_key(text: str, matched_lines: list[str]) -> str:
-    sentences = [part.strip() for part in re.split(r"(?<=[.!?])\s+", text) if part.strip()]
-    headline = " ".join(sentences[:2]) if len(sentences) >= 2 else text
-    normalized = re.sub(r"[^a-z0-9]+", " ", headline.lower()).strip()
-    return f"{','.join(sorted(matched_lines))}:{normalized}"
-
-
 def _priority_label(priority: int) -> str:
     if priority >= 6:
         return "Major"
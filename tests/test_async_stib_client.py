@@ -0,0 +1,158 @@
+from pathlib import Path
+import asyncio
+import json
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+httpx = pytest.importorskip("httpx")
+
+import stib_client
+from async_stib_client import AsyncStibClient
+from stib_client import StopConfig
+
+STOPS = [
+    StopConfig(label="toward ALBERT", pointid="5830", destination="ALBERT", static_id="5830F"),
+    StopConfig(label="toward VAN HAELEN", pointid="0711", destination="VAN HAELEN", static_id="0711F"),
+]
+RECORD = {
+    "lineid": "18",
+    "pointid": "5830",
+    "passingtimes": '[{"destination":{"fr":"ALBERT"},"expectedArrivalTime":"2099-03-27T10:31:00+01:00"}]',
+}
+
+
+def make_client(handler, **kwargs):
+    transport = httpx.MockTransport(handler)
+    return AsyncStibClient(
+        source=kwargs.pop("source", "belgian_mobility"),
+        base_url="https://example.test",
+        client=httpx.AsyncClient(transport=transport),
+        cache=kwargs.pop("cache", None),
+        hedge_after=kwargs.pop("hedge_after", 0),
+        **kwargs,
+    )
+
+
+def test_line_departures_reuse_the_sync_normalization_and_conditional_requests():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        body = {"total_count": 1, "results": [RECORD]}
+        return httpx.Response(200, json=body, headers={"ETag": '"v1"'})
+
+    async def scenario():
+        client = make_client(handler)
+        first = await client.get_line_departures({"18": STOPS})
+        second = await client.get_line_departures({"18": STOPS})
+        await client.aclose()
+        return first, second
+
+    (departures, error), (again, again_error) = asyncio.run(scenario())
+
+    assert error is None and again_error is None
+    assert requests_seen[0].url.params["where"] == 'lineid="18"'
+    assert requests_seen[1].headers["If-None-Match"] == '"v1"'
+    assert [dep.destination for dep in departures["18"]["5830"]] == ["ALBERT"]
+    assert again["18"]["5830"] == departures["18"]["5830"]
+
+
+def test_concurrent_requests_share_one_event_loop_instead_of_blocking():
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"results": []})
+
+    async def scenario():
+        client = make_client(handler)
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(client.get_departures_for_stops(str(line), STOPS) for line in range(50))
+        )
+        elapsed = time.monotonic() - started
+        await client.aclose()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(scenario())
+
+    assert all(error is None for _, error in results)
+    assert elapsed < 1.0
+
+
+def test_slow_requests_are_hedged_and_the_loser_is_cancelled():
+    cancelled = []
+
+    async def handler(request):
+        if request.url.host == "example.test":
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.append(str(request.url))
+                raise
+        return httpx.Response(200, json={"results": [], "source": request.url.host})
+
+    async def scenario():
+        client = make_client(handler, hedge_after=0.05, hedge_to_legacy=True)
+        started = time.monotonic()
+        payload = await client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0)
+        await client.aclose()
+        return payload, elapsed
+
+    payload, elapsed = asyncio.run(scenario())
+
+    assert payload["source"] == httpx.URL(stib_client.LEGACY_WAITING_TIMES_URL).host
+    assert elapsed < 0.5
+    assert len(cancelled) == 1
+
+
+def test_upstream_failures_fall_back_to_empty_departures_with_an_error():
+    def handler(request):
+        return httpx.Response(503)
+
+    async def scenario():
+        client = make_client(handler)
+        result = await client.get_departures_for_stops("18", STOPS)
+        await client.aclose()
+        return result
+
+    departures, error = asyncio.run(scenario())
+
+    assert departures == {"5830": [], "0711": []}
+    assert error == "Departures are temporarily unavailable."
+
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"results": []})
+
+    async def scenario():
+        client = make_client(handler)
+        params = {"where": 'lineid="18"'}
+        failed = await asyncio.gather(
+            *(client._request_json("/rt/WaitingTimes", params=params) for _ in range(10)),
+            return_exceptions=True,
+        )
+        succeeded = await asyncio.gather(
+            *(client._request_json("/rt/WaitingTimes", params=params) for _ in range(10))
+        )
+        await client.aclose()
+        return failed, succeeded
+
+    failed, succeeded = asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in failed)
+    assert all(result is succeeded[0] for result in succeeded)
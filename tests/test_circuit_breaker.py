@@ -0,0 +1,88 @@
+from pathlib import Path
+import asyncio
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise RuntimeError("upstream down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    clock = FakeClock()
+    breaker = CircuitBreaker("/rt/WaitingTimes", failure_threshold=2, reset_after=30, clock=clock)
+    calls = []
+
+    for _ in range(2):
+        try:
+            breaker.call(fail)
+        except RuntimeError:
+            pass
+
+    try:
+        breaker.call(lambda: calls.append(1))
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("expected the circuit to be open")
+    assert breaker.state == "open"
+    assert calls == []
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker("/rt/WaitingTimes", failure_threshold=1, reset_after=30, clock=clock)
+    try:
+        breaker.call(fail)
+    except RuntimeError:
+        pass
+
+    clock.now = 31
+    assert breaker.state == "half-open"
+    try:
+        breaker.call(fail)
+    except RuntimeError:
+        pass
+    assert breaker.state == "open"
+
+    clock.now = 62
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_probe_lets_the_next_call_probe_again():
+    clock = FakeClock()
+    breaker = CircuitBreaker("/rt/WaitingTimes", failure_threshold=1, reset_after=30, clock=clock)
+    try:
+        breaker.call(fail)
+    except RuntimeError:
+        pass
+    clock.now = 31
+
+    async def scenario():
+        probe = asyncio.create_task(breaker.call_async(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+
+        async def ok():
+            return "ok"
+
+        return await breaker.call_async(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
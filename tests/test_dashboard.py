@@ -0,0 +1,571 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import importlib
+import json
+import threading
+import time
+import sys
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dashboard_config import DashboardConfig, DashboardRegistry, FetchPlan
+from dashboard_snapshot import BRUSSELS, SnapshotPoller, SnapshotStore, build_snapshot
+from fragment_cache import FragmentCache
+from stib_client import Departure, Notice
+
+dashboard_app = importlib.import_module("661ACode")
+
+
+@pytest.fixture(autouse=True)
+def isolated_snapshot_store(monkeypatch):
+    monkeypatch.setattr(dashboard_app, "STORE", None)
+    monkeypatch.setattr(dashboard_app.POLLER, "store", None)
+    monkeypatch.setattr(dashboard_app.POLLER, "interval", 0)
+
+
+def arrival(time_local):
+    return datetime.fromisoformat(f"2099-03-27T{time_local}:00+01:00").astimezone(BRUSSELS)
+
+
+def make_snapshot(**overrides):
+    values = {
+        "departures": {
+            "18": {
+                "5830": [Departure(pointid="5830", destination="ALBERT", arrival=arrival("10:31"))],
+                "0711": [],
+            },
+            "4": {"5058": [Departure(pointid="5058", destination="GARE DU NORD", arrival=arrival("10:33"))]},
+            "92": {"5058": []},
+        },
+        "traveller_notices": {"home": []},
+        "errors": {"18": None, "4": None, "92": "Departures are temporarily unavailable.", "notices": None},
+    }
+    values.update(overrides)
+    return build_snapshot(**values)
+
+
+def test_dashboard_renders_from_snapshot_without_upstream_calls(monkeypatch):
+    snapshot = make_snapshot()
+    poller = SnapshotPoller(lambda: snapshot, interval=0)
+    monkeypatch.setattr(dashboard_app, "POLLER", poller)
+
+    response = dashboard_app.app.test_client().get("/")
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "ALBERT" in body
+    assert "10:33" in body
+    assert snapshot.fetched_at.strftime("%H:%M:%S") in body
+
+
+def test_snapshot_is_immutable_and_keeps_per_source_errors():
+    snapshot = make_snapshot()
+
+    assert snapshot.error_for("92") == "Departures are temporarily unavailable."
+    assert snapshot.departures_for("18", "5830")[0].destination == "ALBERT"
+    assert snapshot.departures_for("18", "9999") == ()
+    try:
+        snapshot.departures["18"]["5830"] = ()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("snapshot departures should be read-only")
+
+
+def test_poller_refreshes_when_snapshot_is_too_old():
+    snapshots = [make_snapshot(), make_snapshot()]
+    stale = make_snapshot(fetched_at=snapshots[0].fetched_at - timedelta(minutes=10))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return stale if len(calls) == 1 else snapshots[1]
+
+    poller = SnapshotPoller(fetch, interval=0, max_age=120)
+
+    assert poller.current() is stale
+    assert poller.current() is snapshots[1]
+    assert poller.current() is snapshots[1]
+    assert len(calls) == 2
+
+
+class SlowClient:
+    def __init__(self, release, slow_notices=False):
+        self.release = release
+        self.slow_notices = slow_notices
+        self.departure_calls = []
+        self.max_stale = []
+
+    def get_line_departures(self, line_stops, max_stale=None):
+        self.departure_calls.append(sorted(line_stops))
+        self.max_stale.append(max_stale)
+        if not self.slow_notices:
+            self.release.wait(5)
+        return {
+            line_id: {stop.pointid: [{"destination": f"line {line_id}"}] for stop in stops}
+            for line_id, stops in line_stops.items()
+        }, None
+
+    def get_traveller_notices_by_view(self, views, max_stale=None):
+        if self.slow_notices:
+            self.release.wait(5)
+        return {view: [{"text": "Line 18 diversion"}] for view in views}, None
+
+
+def test_fetch_uses_one_batched_departures_call():
+    release = threading.Event()
+    client = SlowClient(release, slow_notices=True)
+
+    try:
+        snapshot = dashboard_app.fetch_dashboard_snapshot(client=client, deadline=0.2)
+    finally:
+        release.set()
+
+    assert client.departure_calls == [["18", "4", "92"]]
+    assert client.max_stale == [0]
+    assert snapshot.departures_for("4", "5058") == ({"destination": "line 4"},)
+    assert snapshot.departures_for("92", "5058") == ({"destination": "line 92"},)
+    assert snapshot.error_for("notices") == "Traveller notices missed the 0.2s refresh deadline."
+
+
+def test_fetch_reports_sources_that_miss_the_deadline():
+    release = threading.Event()
+    client = SlowClient(release)
+
+    try:
+        snapshot = dashboard_app.fetch_dashboard_snapshot(client=client, deadline=0.2)
+    finally:
+        release.set()
+
+    assert snapshot.departures_for("92", "5058") == ()
+    assert snapshot.error_for("92") == "Line 92 departures missed the 0.2s refresh deadline."
+    assert snapshot.error_for("notices") is None
+    assert snapshot.notices_for("home")[0]["text"] == "Line 18 diversion"
+
+
+def test_fetch_runs_every_batch_in_parallel_when_the_plan_outgrows_the_pool():
+    class PacedClient:
+        def get_line_departures(self, line_stops, max_stale=None):
+            time.sleep(0.2)
+            return {line_id: {"5058": []} for line_id in line_stops}, None
+
+        def get_traveller_notices_by_view(self, views, max_stale=None):
+            time.sleep(0.2)
+            return {view: [] for view in views}, None
+
+    stop = dashboard_app.PLANNER.plan.departure_batches[0]["18"][0]
+    plan = FetchPlan(
+        departure_batches=tuple({str(line): [stop]} for line in range(8)),
+        notice_views={"home": ([], [])},
+    )
+
+    snapshot = dashboard_app.fetch_dashboard_snapshot(client=PacedClient(), deadline=0.35, plan=plan)
+
+    assert all(snapshot.error_for(str(line)) is None for line in range(8))
+    assert snapshot.error_for("notices") is None
+
+
+def test_panels_are_reused_while_their_data_is_unchanged(monkeypatch):
+    fragments = FragmentCache()
+    monkeypatch.setattr(dashboard_app, "FRAGMENTS", fragments)
+    renders = []
+    original_render = dashboard_app._template("stop").render
+    monkeypatch.setattr(
+        dashboard_app._template("stop"),
+        "render",
+        lambda **context: renders.append(context["stop"]["name"]) or original_render(**context),
+    )
+    first = make_snapshot()
+    departures = {line_id: dict(by_stop) for line_id, by_stop in first.departures.items()}
+    departures["92"] = {"5058": [Departure(pointid="5058", destination="SCHAERBEEK", arrival=arrival("10:35"))]}
+    second = make_snapshot(departures=departures)
+
+    with dashboard_app.app.test_request_context("/"):
+        dashboard_app.render_dashboard(dashboard_app.build_dashboard_context(first))
+        dashboard_app.render_dashboard(dashboard_app.build_dashboard_context(second))
+
+    assert renders == ["Bens", "Albert", "Heros / Helden", "Heros / Helden"]
+
+
+def test_dashboard_api_returns_compact_panel_and_notice_data(monkeypatch):
+    notice = Notice(text="Line 18 diversion", priority=6, lines=("18",), points=("0711",), relevance=3)
+    snapshot = make_snapshot(traveller_notices={"home": [notice]})
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+
+    payload = dashboard_app.app.test_client().get("/api/dashboard").get_json()
+
+    assert [panel["id"] for panel in payload["panels"]] == ["bens", "albert", "heros"]
+    departure = payload["panels"][0]["departures"][0]
+    assert departure["destination"] == "ALBERT"
+    assert departure["time_local"] == "10:31"
+    assert departure["expected_at"] == "2099-03-27T10:31:00+01:00"
+    assert departure["minutes_until"] > 0
+    assert payload["panels"][2]["error"] == "Departures are temporarily unavailable."
+    assert payload["panels"][2]["line_groups"][0]["departures"][0]["time_local"] == "10:33"
+    assert payload["notices"][0]["lines"] == ["18"]
+    assert payload["notices"][0]["scope_label"] == "For your route"
+    assert "points" not in payload["notices"][0]
+
+
+def test_event_stream_pushes_full_state_then_only_changes(monkeypatch):
+    snapshot = make_snapshot()
+    poller = SnapshotPoller(lambda: snapshot, interval=0)
+    monkeypatch.setattr(dashboard_app, "POLLER", poller)
+    monkeypatch.setattr(dashboard_app, "EVENTS_HEARTBEAT_SECONDS", 0.01)
+
+    response = dashboard_app.app.test_client().get("/events", buffered=False)
+    chunks = response.response
+
+    assert response.mimetype == "text/event-stream"
+    assert next(chunks).decode() == "retry: 5000\n\n"
+    first = next(chunks).decode()
+    assert "event: dashboard" in first
+    assert '"id":"bens"' in first and '"notices":[]' in first
+    assert next(chunks).decode() == ": keepalive\n\n"
+
+    errors = dict(snapshot.errors, **{"92": None})
+    changed = make_snapshot(errors=errors)
+    poller.fetch = lambda: changed
+    poller.refresh()
+    delta = json.loads(next(chunks).decode().split("data: ", 1)[1])
+
+    assert [panel["id"] for panel in delta["panels"]] == ["heros"]
+    assert "notices" not in delta
+    response.close()
+
+
+def test_event_stream_resumes_without_resending_known_state(monkeypatch):
+    snapshot = make_snapshot()
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+    monkeypatch.setattr(dashboard_app, "EVENTS_HEARTBEAT_SECONDS", 0.01)
+    client = dashboard_app.app.test_client()
+
+    first = client.get("/events", buffered=False)
+    next(first.response)
+    event_id = next(first.response).decode().split("\n")[0].removeprefix("id: ")
+    first.close()
+
+    resumed = client.get("/events", buffered=False, headers={"Last-Event-ID": event_id})
+    next(resumed.response)
+
+    assert next(resumed.response).decode() == ": keepalive\n\n"
+    resumed.close()
+
+
+def test_event_stream_rejects_streams_over_the_worker_cap(monkeypatch):
+    monkeypatch.setattr(dashboard_app, "EVENT_STREAM_SLOTS", threading.BoundedSemaphore(1))
+    dashboard_app.EVENT_STREAM_SLOTS.acquire()
+
+    response = dashboard_app.app.test_client().get("/events")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_event_streams_leave_worker_threads_for_ordinary_requests():
+    assert dashboard_app._event_stream_cap(8) == 6
+    assert dashboard_app._event_stream_cap(8, requested=20) == 6
+    assert dashboard_app._event_stream_cap(8, requested=3) == 3
+    assert dashboard_app._event_stream_cap(2) == 0
+    assert dashboard_app.EVENTS_MAX_STREAMS < dashboard_app.WORKER_THREADS
+
+
+def test_event_streams_share_one_payload_per_snapshot(monkeypatch):
+    snapshot = make_snapshot()
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+    monkeypatch.setattr(dashboard_app, "EVENTS_HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(dashboard_app, "_STREAM_PAYLOADS", {})
+    built = []
+    build_context = dashboard_app.build_dashboard_context
+
+    def counting_build(*args, **kwargs):
+        built.append(args)
+        return build_context(*args, **kwargs)
+
+    monkeypatch.setattr(dashboard_app, "build_dashboard_context", counting_build)
+    client = dashboard_app.app.test_client()
+    events = []
+    for _ in range(3):
+        stream = client.get("/events", buffered=False)
+        next(stream.response)
+        events.append(next(stream.response).decode())
+        assert next(stream.response).decode() == ": keepalive\n\n"
+        stream.close()
+
+    assert len(built) == 1
+    assert len(set(events)) == 1
+
+
+def test_context_recomputes_countdowns_and_drops_departed_trams():
+    now = datetime.now(BRUSSELS)
+    snapshot = make_snapshot(
+        departures={
+            "18": {
+                "5830": [
+                    Departure(pointid="5830", destination="ALBERT", arrival=now - timedelta(minutes=1)),
+                    Departure(pointid="5830", destination="ALBERT", arrival=now + timedelta(minutes=5, seconds=30)),
+                ]
+            }
+        }
+    )
+
+    with dashboard_app.app.test_request_context("/"):
+        context = dashboard_app.build_dashboard_context(snapshot)
+
+    assert [dep["minutes_until"] for dep in context["all_departures"][0]["departures"]] == [5]
+
+
+def test_dashboards_are_served_by_slug_with_their_own_notices(monkeypatch):
+    office = DashboardConfig(
+        slug="office",
+        title="Office board",
+        notice_lines=("4",),
+        panels=(dashboard_app.DASHBOARDS.default.panels[2],),
+    )
+    registry = DashboardRegistry(
+        dashboards={**dashboard_app.DASHBOARDS.dashboards, "office": office},
+        default_slug=dashboard_app.DASHBOARDS.default_slug,
+    )
+    notice = Notice(text="Line 4 diversion", priority=6, lines=("4",), points=(), relevance=1)
+    snapshot = make_snapshot(traveller_notices={"home": [], "office": [notice]})
+    monkeypatch.setattr(dashboard_app, "DASHBOARDS", registry)
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+    client = dashboard_app.app.test_client()
+
+    page = client.get("/d/office").get_data(as_text=True)
+    payload = client.get("/api/dashboard/office").get_json()
+
+    assert "<title>Office board</title>" in page
+    assert '"/api/dashboard/office"' in page and '"/events/office"' in page
+    assert [panel["id"] for panel in payload["panels"]] == ["heros"]
+    assert payload["notices"][0]["text"] == "Line 4 diversion"
+    assert client.get("/api/dashboard").get_json()["notices"] == []
+    assert client.get("/d/nowhere").status_code == 404
+
+
+def test_stop_board_reads_any_stop_on_an_indexed_line_without_fetching(monkeypatch):
+    snapshot = make_snapshot(
+        departures={
+            "4": {
+                "5058": [Departure(pointid="5058", destination="GARE DU NORD", arrival=arrival("10:33"))],
+                "6101": [Departure(pointid="6101", destination="STALLE", arrival=arrival("10:40"))],
+            },
+            "92": {"6101": [Departure(pointid="6101", destination="FORT-JACO", arrival=arrival("10:42"))]},
+        }
+    )
+    fetches = []
+    poller = SnapshotPoller(lambda: fetches.append(1) or snapshot, interval=0)
+    poller.refresh()
+    fetches.clear()
+    monkeypatch.setattr(dashboard_app, "POLLER", poller)
+    client = dashboard_app.app.test_client()
+
+    grouped = client.get("/api/stop/6101?lines=4,92").get_json()
+    single = client.get("/api/stop/6101?lines=4").get_json()
+    page = client.get("/stop/6101").get_data(as_text=True)
+
+    assert fetches == []
+    assert [group["departures"][0]["destination"] for group in grouped["panels"][0]["line_groups"]] == [
+        "STALLE",
+        "FORT-JACO",
+    ]
+    assert [dep["destination"] for dep in single["panels"][0]["departures"]] == ["STALLE"]
+    assert "10:42" in page and "/api/stop/6101?lines=4,92" in page
+    assert client.get("/api/stop/6101?lines=4%22%20OR").status_code == 400
+
+
+def test_stop_board_queues_new_lines_for_the_poller_and_keeps_only_real_ones(monkeypatch):
+    heysel = Departure(pointid="3520", destination="HEYSEL", arrival=arrival("10:44"))
+
+    class LineClient:
+        def get_line_departures(self, line_stops, max_stale=None):
+            return {
+                line_id: {"3520": [heysel]} if line_id == "7" else {} for line_id in line_stops
+            }, None
+
+        def get_traveller_notices_by_view(self, views, max_stale=None):
+            return {view: [] for view in views}, None
+
+    planner = dashboard_app.FetchPlanner(dashboard_app.DASHBOARDS.dashboards.values())
+    monkeypatch.setattr(dashboard_app, "PLANNER", planner)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return dashboard_app.fetch_dashboard_snapshot(client=LineClient())
+
+    poller = SnapshotPoller(fetch, interval=0)
+    poller.refresh()
+    monkeypatch.setattr(dashboard_app, "POLLER", poller)
+    client = dashboard_app.app.test_client()
+
+    queued = client.get("/api/stop/3520?lines=7,zz9").get_json()
+
+    assert len(fetches) == 1
+    assert queued["panels"][0]["error"] == "Line 7, zz9 will be available shortly."
+    assert {"7", "zz9"} <= set(planner.plan.line_ids)
+
+    poller.refresh()
+    served = client.get("/api/stop/3520?lines=7").get_json()
+    junk = client.get("/api/stop/3520?lines=zz9").get_json()
+
+    assert len(fetches) == 2
+    assert "7" in planner.plan.line_ids and "zz9" not in planner.plan.line_ids
+    assert served["panels"][0]["departures"][0]["destination"] == "HEYSEL"
+    assert junk["panels"][0]["error"] == "Line zz9 is not tracked on this server."
+
+
+def test_metrics_endpoint_reports_render_size_and_snapshot_age(monkeypatch):
+    snapshot = make_snapshot()
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+    dashboard_app.SNAPSHOT_TIMESTAMP.set(snapshot.fetched_at.timestamp())
+    client = dashboard_app.app.test_client()
+    client.get("/")
+
+    response = client.get("/metrics")
+    body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/plain"
+    assert 'dashboard_render_seconds_count{view="dashboard"}' in body
+    assert 'http_response_size_bytes_count{endpoint="dashboard"}' in body
+    assert "# TYPE stib_upstream_request_seconds histogram" in body
+    age = float(body.split("\ndashboard_snapshot_age_seconds ", 1)[1].split("\n", 1)[0])
+    assert 0 <= age < 60
+
+
+def test_sampled_requests_get_server_timing_and_request_id(monkeypatch):
+    snapshot = make_snapshot()
+    monkeypatch.setattr(dashboard_app, "POLLER", SnapshotPoller(lambda: snapshot, interval=0))
+    client = dashboard_app.app.test_client()
+
+    untraced = client.get("/")
+    monkeypatch.setattr("tracing.TRACE_SAMPLE_RATE", 1.0)
+    traced = client.get("/", headers={"X-Request-ID": "office-screen-1"})
+
+    assert "Server-Timing" not in untraced.headers
+    assert traced.headers["X-Request-ID"] == "office-screen-1"
+    timing = traced.headers["Server-Timing"]
+    assert "context;dur=" in timing
+    assert 'render;desc="dashboard";dur=' in timing
+    assert "total;dur=" in timing
+
+
+def test_fresh_poller_serves_the_persisted_warm_snapshot_while_refreshing(tmp_path):
+    notice = Notice(text="Line 18 diversion", priority=6, lines=("18",), points=("0711",), relevance=3)
+    persisted = make_snapshot(
+        traveller_notices={"home": [notice]},
+        fetched_at=datetime.now(BRUSSELS) - timedelta(minutes=5),
+    )
+    store = SnapshotStore(tmp_path / "snapshot.json")
+    SnapshotPoller(lambda: persisted, interval=0, store=store).refresh()
+    store.release()
+    too_old = SnapshotPoller(make_snapshot, interval=0, store=store, warm_max_age=60)
+    assert too_old._load_warm() is None
+    release = threading.Event()
+    fresh = make_snapshot()
+
+    def slow_fetch():
+        release.wait(5)
+        return fresh
+
+    poller = SnapshotPoller(slow_fetch, interval=60, max_age=120, store=store)
+    poller.start()
+    try:
+        warm = poller.current()
+    finally:
+        release.set()
+        poller.stop()
+
+    assert warm.fetched_at == persisted.fetched_at
+    assert warm.departures_for("18", "5830") == persisted.departures_for("18", "5830")
+    assert warm.notices_for("home") == (notice,)
+    assert warm.error_for("92") == "Departures are temporarily unavailable."
+
+
+def test_one_worker_leads_and_the_others_adopt_its_snapshot(tmp_path):
+    pytest.importorskip("fcntl")
+    path = tmp_path / "snapshot.json"
+    leader_store, follower_store = SnapshotStore(path), SnapshotStore(path)
+    published = make_snapshot()
+
+    def must_not_fetch():
+        raise AssertionError("followers reuse the leader's snapshot")
+
+    leader = SnapshotPoller(lambda: published, interval=0, store=leader_store)
+    follower = SnapshotPoller(must_not_fetch, interval=0, store=follower_store, leader_wait=1)
+    assert leader.refresh() is published
+    assert leader_store.is_leader
+
+    adopted = follower.refresh(if_older_than=120)
+    assert not follower_store.is_leader
+    assert adopted.fetched_at == published.fetched_at
+    assert follower_store.read() is adopted
+
+    follower_store.request_lines(["7", "7", "25"])
+    follower_store.request_lines(["7"])
+    assert leader_store.take_requested_lines() == ["7", "25"]
+    assert leader_store.take_requested_lines() == []
+
+    installed = []
+    follower.on_install = installed.append
+    newer = make_snapshot(fetched_at=published.fetched_at + timedelta(seconds=30))
+    publisher = threading.Timer(0.2, leader_store.publish, args=(newer,))
+    publisher.start()
+    refreshed = follower.refresh()
+    publisher.join()
+
+    assert refreshed.fetched_at == newer.fetched_at
+    assert installed == [refreshed]
+
+    leader_store.release()
+    assert follower_store.try_lead()
+    follower_store.release()
+
+
+def test_waiting_for_the_leader_does_not_block_a_refresh_that_can_lead(tmp_path):
+    pytest.importorskip("fcntl")
+    path = tmp_path / "snapshot.json"
+    leader_store, follower_store = SnapshotStore(path), SnapshotStore(path)
+    stale = make_snapshot(fetched_at=datetime.now(BRUSSELS) - timedelta(minutes=10))
+    fetched = make_snapshot()
+    assert leader_store.try_lead()
+    leader_store.publish(stale)
+
+    follower = SnapshotPoller(lambda: fetched, interval=0, store=follower_store, leader_wait=2)
+    waiting = threading.Thread(target=follower.refresh, kwargs={"if_older_than": 120})
+    waiting.start()
+    time.sleep(0.2)
+    leader_store.release()
+
+    started = time.monotonic()
+    assert follower.refresh(if_older_than=120) is fetched
+    assert time.monotonic() - started < 1
+    waiting.join()
+    follower_store.release()
+
+
+def test_only_the_leader_drains_lines_requested_by_followers(tmp_path, monkeypatch):
+    pytest.importorskip("fcntl")
+    path = tmp_path / "snapshot.json"
+    leader_store, follower_store = SnapshotStore(path), SnapshotStore(path)
+    assert leader_store.try_lead()
+    follower_store.request_lines(["7"])
+    release = threading.Event()
+    release.set()
+    monkeypatch.setattr(dashboard_app, "STORE", follower_store)
+
+    dashboard_app.fetch_dashboard_snapshot(client=SlowClient(release))
+
+    assert leader_store.take_requested_lines() == ["7"]
+    leader_store.release()
+
+
+def test_default_warm_snapshot_path_is_scoped_to_the_deployment(monkeypatch):
+    monkeypatch.setenv("STIB_DATA_SOURCE", "belgian_mobility")
+    belgian_mobility = dashboard_app._default_warm_snapshot_path()
+    monkeypatch.setenv("STIB_DATA_SOURCE", "legacy")
+
+    assert dashboard_app._default_warm_snapshot_path() != belgian_mobility
+    assert Path(belgian_mobility).name.startswith("661atransport-snapshot-")
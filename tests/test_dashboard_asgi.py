@@ -0,0 +1,88 @@
+from pathlib import Path
+import asyncio
+import json
+import sys
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("httpx")
+
+import dashboard_asgi
+from dashboard_asgi import AsyncSnapshotPoller
+from test_dashboard import make_snapshot
+
+
+def call(path, method="GET"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"dashboard.test")],
+        "server": ("dashboard.test", 80),
+        "scheme": "http",
+        "http_version": "1.1",
+    }
+    asyncio.run(dashboard_asgi.app(scope, receive, send))
+    headers = dict(messages[0]["headers"])
+    return messages[0]["status"], headers, messages[1]["body"]
+
+
+def use_snapshot(monkeypatch, snapshot):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return snapshot
+
+    monkeypatch.setattr(dashboard_asgi, "POLLER", AsyncSnapshotPoller(fetch, interval=0))
+    return calls
+
+
+def test_asgi_dashboard_api_serves_the_same_payload_as_the_flask_view(monkeypatch):
+    use_snapshot(monkeypatch, make_snapshot())
+
+    status, headers, body = call("/api/dashboard")
+
+    payload = json.loads(body)
+    assert status == 200
+    assert headers[b"content-type"] == b"application/json"
+    assert [panel["id"] for panel in payload["panels"]] == ["bens", "albert", "heros"]
+    assert payload["panels"][0]["departures"][0]["destination"] == "ALBERT"
+
+
+def test_asgi_dashboard_page_polls_instead_of_streaming(monkeypatch):
+    calls = use_snapshot(monkeypatch, make_snapshot())
+
+    status, headers, body = call("/")
+    call("/d/home")
+
+    html = body.decode()
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/html")
+    assert "ALBERT" in html
+    assert "const dashboardEventsUrl = null;" in html
+    assert calls == [1]
+
+
+def test_asgi_routes_reject_unknown_dashboards_and_methods(monkeypatch):
+    use_snapshot(monkeypatch, make_snapshot())
+
+    assert call("/d/nowhere")[0] == 404
+    assert call("/events")[0] == 404
+    assert call("/api/dashboard", method="POST")[0] == 405
+    assert call("/static/../661ACode.py")[0] == 404
+    status, headers, body = call("/static/backgrounds/uccle-street.svg", method="HEAD")
+    assert status == 200 and body == b""
+    assert headers[b"content-type"] == b"image/svg+xml"
@@ -0,0 +1,99 @@
+from pathlib import Path
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dashboard_config import FetchPlanner, load_dashboards, plan_fetches
+
+
+def write_config(tmp_path, dashboards, default=None):
+    path = tmp_path / "dashboards.json"
+    path.write_text(json.dumps({"default": default, "dashboards": dashboards}))
+    return path
+
+
+def panel(panel_id, pointid, *line_ids):
+    return {
+        "id": panel_id,
+        "stop": {"pointid": pointid, "destination": panel_id.upper()},
+        "lines": [{"line_id": line_id} for line_id in line_ids],
+    }
+
+
+def test_planner_unions_stops_across_dashboards_into_one_query_per_batch(tmp_path):
+    registry = load_dashboards(
+        write_config(
+            tmp_path,
+            [
+                {"slug": "home", "notice_lines": ["18"], "panels": [panel("a", "5830", "18"), panel("b", "5058", "4", "92")]},
+                {"slug": "office", "notice_lines": ["4"], "panels": [panel("c", "5830", "18"), panel("d", "5058", "4")]},
+                {"slug": "school", "notice_lines": ["18"], "panels": [panel("e", "0711", "18")]},
+            ],
+        )
+    )
+
+    plan = plan_fetches(registry.dashboards.values())
+
+    assert registry.default.slug == "home"
+    assert len(plan.departure_batches) == 1
+    assert {line: [stop.pointid for stop in stops] for line, stops in plan.departure_batches[0].items()} == {
+        "18": ["5830", "0711"],
+        "4": ["5058"],
+        "92": ["5058"],
+    }
+    assert sorted(plan.notice_views) == ["home", "office", "school"]
+    assert [stop.pointid for stop in plan.notice_views["office"][1]] == ["5830", "5058"]
+    assert registry.get("school").panels[0].display_mode == "single"
+    assert registry.get("home").panels[1].display_mode == "grouped"
+
+
+def test_planner_batches_whole_lines_and_keeps_extra_lines_separate(tmp_path):
+    registry = load_dashboards(
+        write_config(
+            tmp_path,
+            [{"slug": "big", "panels": [panel(f"p{n}", f"{n:04d}", "18", "4", "92") for n in range(3)]}],
+        )
+    )
+
+    plan = plan_fetches(registry.dashboards.values(), extra_lines=["7", "4"], lines_per_query=2)
+
+    assert [list(batch) for batch in plan.departure_batches] == [["18", "4"], ["92"], ["7"]]
+    assert plan.departure_batches[2]["7"] == []
+
+
+def test_planner_tracks_a_bounded_number_of_extra_lines(tmp_path):
+    registry = load_dashboards(write_config(tmp_path, [{"slug": "home", "panels": [panel("a", "5830", "18")]}]))
+    planner = FetchPlanner(registry.dashboards.values(), max_extra_lines=1)
+
+    assert planner.track_lines(["18", "4"]) == ["4"]
+    assert planner.track_lines(["4", "92"]) == []
+    assert planner.plan.line_ids == ["18", "4"]
+
+
+def test_planner_drops_lines_without_records_and_lines_left_idle(tmp_path):
+    registry = load_dashboards(write_config(tmp_path, [{"slug": "home", "panels": [panel("a", "5830", "18")]}]))
+    now = [0.0]
+    planner = FetchPlanner(registry.dashboards.values(), idle_seconds=60, clock=lambda: now[0])
+
+    assert planner.track_lines(["4", "zz9", "92"]) == ["4", "zz9", "92"]
+    assert planner.settle({"4": {"5058": []}, "zz9": {}, "92": {}}, {"92": "Departures are temporarily unavailable."}) == ["zz9"]
+    assert planner.track_lines(["zz9"]) == []
+    assert planner.plan.line_ids == ["18", "4", "92"]
+
+    now[0] = 45
+    planner.track_lines(["4"])
+    now[0] = 90
+    assert planner.settle({"4": {}, "92": {}}, {}) == ["92"]
+    assert planner.plan.line_ids == ["18", "4"]
+
+
+def test_unknown_default_dashboard_is_rejected(tmp_path):
+    path = write_config(tmp_path, [{"slug": "home", "panels": []}], default="office")
+
+    try:
+        load_dashboards(path)
+    except ValueError as exc:
+        assert "office" in str(exc)
+    else:
+        raise AssertionError("expected a ValueError")
@@ -0,0 +1,49 @@
+from pathlib import Path
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from metrics import MetricsRegistry
+
+
+def test_histograms_and_counters_render_in_prometheus_text_format():
+    registry = MetricsRegistry(directory="")
+    latency = registry.histogram("upstream_seconds", "Latency.", ("path",), buckets=(0.1, 1.0))
+    errors = registry.counter("upstream_errors_total", "Errors.", ("kind",))
+
+    latency.observe(0.05, path="/rt/WaitingTimes")
+    latency.observe(0.5, path="/rt/WaitingTimes")
+    latency.observe(3.0, path="/rt/WaitingTimes")
+    errors.inc(kind='time"out')
+
+    text = registry.render()
+
+    assert "# TYPE upstream_seconds histogram" in text
+    assert 'upstream_seconds_bucket{path="/rt/WaitingTimes",le="0.1"} 1' in text
+    assert 'upstream_seconds_bucket{path="/rt/WaitingTimes",le="1"} 2' in text
+    assert 'upstream_seconds_bucket{path="/rt/WaitingTimes",le="+Inf"} 3' in text
+    assert 'upstream_seconds_count{path="/rt/WaitingTimes"} 3' in text
+    assert 'upstream_errors_total{kind="time\\"out"} 1' in text
+
+
+def test_workers_are_merged_and_dead_worker_gauges_are_dropped(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    hits = registry.counter("cache_requests_total", "Cache lookups.", ("result",))
+    age = registry.gauge("snapshot_timestamp_seconds", "Snapshot time.")
+    latency = registry.histogram("render_seconds", "Render.", buckets=(0.1,))
+    hits.inc(result="hit")
+    age.set(100)
+    latency.observe(0.05)
+    dead_worker = {
+        "cache_requests_total": [[["hit"], 4.0], [["miss"], 1.0]],
+        "snapshot_timestamp_seconds": [[[], 999.0]],
+        "render_seconds": [[[], [2, 0.3, 3]]],
+    }
+    (tmp_path / "999999999.json").write_text(json.dumps(dead_worker))
+
+    values = registry.collect()
+
+    assert values["cache_requests_total"] == {("hit",): 5.0, ("miss",): 1.0}
+    assert values["snapshot_timestamp_seconds"] == {(): 100.0}
+    assert values["render_seconds"][()][-1] == 4
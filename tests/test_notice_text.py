@@ -0,0 +1,30 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from notice_text import NOTICE_TEXT
+
+
+def test_process_cleans_text_and_splits_sentences_in_one_call():
+    processed = NOTICE_TEXT.process("Works.  Stop moved.Stop now on avenue\nBrugmann.")
+
+    assert processed.text == "Works. Stop moved. Stop now on avenue Brugmann."
+    assert processed.sentences == ["Works.", "Stop moved.", "Stop now on avenue Brugmann."]
+    assert processed.headline_key == "works stop moved"
+
+
+def test_process_uses_whole_text_as_headline_for_single_sentence():
+    processed = NOTICE_TEXT.process("Line 18 diversion at Albert")
+
+    assert processed.sentences == ["Line 18 diversion at Albert"]
+    assert processed.headline_key == "line 18 diversion at albert"
+    assert processed.linked_date is None
+
+
+def test_process_extracts_linked_dates_in_english_french_and_dutch():
+    assert NOTICE_TEXT.process("Works. From 6 Jan, line diverted.").linked_date == "6 Jan"
+    assert NOTICE_TEXT.process("Travaux. Dès le 6/1, ligne déviée.").linked_date == "6/1"
+    assert NOTICE_TEXT.process("Travaux. À partir du 3 février, arrêt déplacé.").linked_date == "3 février"
+    assert NOTICE_TEXT.process("Werken. Vanaf 7/2, halte verplaatst.").linked_date == "7/2"
+    assert NOTICE_TEXT.process("Met ingang van 12/3 rijdt lijn 4 niet.").linked_date == "12/3"
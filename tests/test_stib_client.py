@@ -1,9 +1,21 @@
 from pathlib import Path
+import json
 import sys
+import threading
+import time
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from stib_client import StopConfig, StibClient, _extract_notice_linked_date, _extract_notice_text
+import stib_client
+from circuit_breaker import CircuitBreaker
+from stib_client import (
+    NoticeRecordMemo,
+    ResponseCache,
+    StopConfig,
+    StibClient,
+    get_shared_client,
+    _extract_notice_text,
+)
 
 
 class FakeClient(StibClient):
@@ -12,7 +24,7 @@ class FakeClient(StibClient):
         self.waiting_records = waiting_records or []
         self.traveller_records = traveller_records or []
 
-    def _request_json(self, path, params=None):
+    def _request_json(self, path, params=None, max_stale=None):
         if path == "/rt/WaitingTimes":
             return {"results": self.waiting_records}
         if path == "/rt/TravellersInformation":
@@ -47,8 +59,8 @@ def test_departures_are_grouped_and_sorted():
     departures, error = client.get_departures_for_stops("18", STOPS)
 
     assert error is None
-    assert [item["time_local"] for item in departures["5830"]] == ["10:31", "10:40"]
-    assert departures["0711"][0]["destination"] == "VAN HAELEN"
+    assert [item.time_local for item in departures["5830"]] == ["10:31", "10:40"]
+    assert departures["0711"][0].destination == "VAN HAELEN"
 
 
 def test_past_departures_are_removed():
@@ -67,7 +79,7 @@ def test_past_departures_are_removed():
     departures, _ = client.get_departures_for_stops("18", STOPS)
 
     assert len(departures["5830"]) == 1
-    assert departures["5830"][0]["time_local"] == "10:10"
+    assert departures["5830"][0].time_local == "10:10"
 
 
 def test_traveller_notice_prefers_english_and_marks_relevance():
@@ -93,10 +105,10 @@ def test_traveller_notice_prefers_english_and_marks_relevance():
     notices, error = client.get_traveller_notices(MONITORED_LINES, STOPS)
 
     assert error is None
-    assert notices[0]["text"] == "Line 18 diversion at Albert"
-    assert notices[0]["relevance"] == 3
-    assert notices[0]["scope_label"] == "For your route"
-    assert notices[0]["linked_date"] is None
+    assert notices[0].text == "Line 18 diversion at Albert"
+    assert notices[0].relevance == 3
+    assert notices[0].scope_label == "For your route"
+    assert notices[0].linked_date is None
 
 
 def test_traveller_notice_falls_back_to_high_priority_monitored_line():
@@ -121,8 +133,8 @@ def test_traveller_notice_falls_back_to_high_priority_monitored_line():
 
     notices, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
 
-    assert notices[0]["text"] == "High priority line 4 notice"
-    assert notices[0]["scope_label"] == "For your route"
+    assert notices[0].text == "High priority line 4 notice"
+    assert notices[0].scope_label == "For your route"
 
 
 def test_traveller_notice_list_is_capped_at_six():
@@ -167,7 +179,7 @@ def test_traveller_notice_filters_generic_messages_and_cleans_spacing():
     notices, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
 
     assert len(notices) == 1
-    assert notices[0]["text"] == "Works. Stop moved. Stop now on avenue Brugmann."
+    assert notices[0].text == "Works. Stop moved. Stop now on avenue Brugmann."
 
 
 def test_traveller_notice_deduplicates_similar_event_branches():
@@ -224,7 +236,7 @@ def test_traveller_notice_excludes_unmonitored_and_network_wide_updates():
 
     notices, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
 
-    assert [notice["text"] for notice in notices] == ["Line 10 notice"]
+    assert [notice.text for notice in notices] == ["Line 10 notice"]
 
 
 def test_traveller_notice_excludes_low_priority_advisories():
@@ -253,7 +265,489 @@ def test_extract_notice_text_joins_unique_sections():
     assert text == "First alert Second alert"
 
 
-def test_extract_notice_linked_date_handles_multilingual_prefixes():
-    assert _extract_notice_linked_date("Works. From 6 Jan, line diverted.") == "6 Jan"
-    assert _extract_notice_linked_date("Travaux. Dès le 6/1, ligne déviée.") == "6/1"
-    assert _extract_notice_linked_date("Werken. Vanaf 7/2, halte verplaatst.") == "7/2"
+class CountingClient(StibClient):
+    def __init__(self, cache):
+        super().__init__(source="belgian_mobility", cache=cache)
+        self.calls = 0
+
+    def _fetch_json(self, path, params=None):
+        self.calls += 1
+        return {"results": [], "call": self.calls}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_response_cache_serves_fresh_entries_without_refetching():
+    clock = FakeClock()
+    client = CountingClient(ResponseCache(clock=clock))
+
+    first = client._request_json("/rt/WaitingTimes", params={"limit": 100})
+    clock.now = 19
+    second = client._request_json("/rt/WaitingTimes", params={"limit": 100})
+
+    assert first is second
+    assert client.calls == 1
+
+
+def test_response_cache_serves_stale_entry_while_revalidating():
+    clock = FakeClock()
+    pending = []
+    client = CountingClient(ResponseCache(clock=clock, spawn=pending.append))
+
+    client._request_json("/rt/WaitingTimes")
+    clock.now = 25
+    stale = client._request_json("/rt/WaitingTimes")
+    client._request_json("/rt/WaitingTimes")
+
+    assert stale["call"] == 1
+    assert len(pending) == 1
+
+    pending[0]()
+
+    assert client._request_json("/rt/WaitingTimes")["call"] == 2
+
+
+def test_refresh_reads_skip_stale_entries_and_fetch_synchronously():
+    clock = FakeClock()
+    pending = []
+    client = CountingClient(ResponseCache(clock=clock, spawn=pending.append))
+
+    client._request_json("/rt/WaitingTimes", max_stale=0)
+    clock.now = 30
+    fresh = client._request_json("/rt/WaitingTimes", max_stale=0)
+
+    assert fresh["call"] == 2
+    assert pending == []
+    assert client._request_json("/rt/WaitingTimes")["call"] == 2
+
+
+def test_response_cache_revalidates_inline_without_deadlocking():
+    clock = FakeClock()
+    client = CountingClient(ResponseCache(clock=clock, spawn=lambda revalidate: revalidate()))
+    client._request_json("/rt/WaitingTimes")
+    clock.now = 25
+    results = []
+
+    worker = threading.Thread(
+        target=lambda: results.append(client._request_json("/rt/WaitingTimes")), daemon=True
+    )
+    worker.start()
+    worker.join(2)
+
+    assert not worker.is_alive()
+    assert results[0]["call"] == 1
+    assert client._request_json("/rt/WaitingTimes")["call"] == 2
+
+
+def test_response_cache_evicts_least_recently_used_entry():
+    client = CountingClient(ResponseCache(clock=FakeClock(), max_entries=2))
+
+    client._request_json("/rt/TravellersInformation", params={"limit": 254})
+    client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+    client._request_json("/rt/TravellersInformation", params={"limit": 254})
+    client._request_json("/rt/WaitingTimes", params={"where": 'lineid="4"'})
+    client._request_json("/rt/TravellersInformation", params={"limit": 254})
+    assert client.calls == 3
+
+    client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+    assert client.calls == 4
+
+
+def test_response_cache_applies_ttl_per_path():
+    clock = FakeClock()
+    client = CountingClient(ResponseCache(clock=clock, stale_seconds=0))
+
+    client._request_json("/rt/TravellersInformation", params={"limit": 254})
+    client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+    clock.now = 60
+    client._request_json("/rt/TravellersInformation", params={"limit": 254})
+    client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+
+    assert client.calls == 3
+
+
+class PagedClient(StibClient):
+    def __init__(self, pages):
+        super().__init__(source="belgian_mobility", cache=None)
+        self.pages = pages
+        self.requests = []
+
+    def _fetch_json(self, path, params=None):
+        self.requests.append(params)
+        return self.pages[params["offset"] // params["limit"]]
+
+
+def test_paged_results_are_ordered_deduplicated_and_cached_as_one_result():
+    record = {
+        "lineid": "18",
+        "pointid": "5830",
+        "passingtimes": '[{"destination":{"fr":"ALBERT"},"expectedArrivalTime":"2099-03-27T10:31:00+01:00"}]',
+    }
+    client = PagedClient(
+        [
+            {"total_count": 101, "results": [{"lineid": "18", "pointid": "9999"}] * 99 + [record]},
+            {"total_count": 101, "results": [record]},
+        ]
+    )
+    client.cache = ResponseCache()
+
+    departures, _ = client.get_line_departures({"18": STOPS})
+    again, _ = client.get_line_departures({"18": STOPS})
+
+    assert [params["order_by"] for params in client.requests] == ["lineid,pointid"] * 2
+    assert len(client.requests) == 2
+    assert len(client.cache) == 1
+    assert len(departures["18"]["5830"]) == 1
+    assert again == departures
+
+
+def test_line_departures_query_whole_lines_and_index_every_stop():
+    def passing(pointid, destination, time_local):
+        return {
+            "lineid": "4",
+            "pointid": pointid,
+            "passingtimes": f'[{{"destination":{{"fr":"{destination}"}},"expectedArrivalTime":"2099-03-27T{time_local}:00+01:00"}}]',
+        }
+
+    heros = StopConfig(label="Heros", pointid="5058", destination="GARE DU NORD")
+    client = PagedClient(
+        [{"total_count": 2, "results": [passing("5058", "GARE DU NORD", "10:32"), passing("6101", "STALLE", "10:40")]}]
+    )
+
+    departures, error = client.get_line_departures({"4": [heros], "92": [heros]})
+
+    assert error is None
+    assert client.requests[0]["where"] == 'lineid="4" OR lineid="92"'
+    assert departures["4"]["5058"][0].destination == "GARE DU NORD"
+    assert departures["4"]["6101"][0].destination == "STALLE"
+    assert departures["92"] == {"5058": []}
+
+
+def test_default_client_uses_pooled_session_and_split_timeouts():
+    client = StibClient(source="belgian_mobility", cache=None)
+    adapter = client.session.get_adapter("https://example.test")
+
+    assert adapter._pool_maxsize == 10
+    assert "gzip" in client.session.headers["Accept-Encoding"]
+    assert client.timeout == (3.05, 10.0)
+
+
+def test_shared_client_is_reused_within_a_process():
+    assert get_shared_client() is get_shared_client()
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+NOTICE_PAYLOAD = json.dumps(
+    {
+        "results": [
+            {
+                "content": '[{"text":[{"en":"Line 18 diversion at Albert"}]}]',
+                "lines": '[{"id":"18"}]',
+                "points": '[{"id":"0711"}]',
+                "priority": 6,
+            }
+        ]
+    }
+).encode()
+
+
+def test_conditional_requests_reuse_normalized_notices_on_304():
+    session = FakeSession(
+        [
+            FakeResponse(content=NOTICE_PAYLOAD, headers={"ETag": '"v1"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"}),
+            FakeResponse(status_code=304),
+        ]
+    )
+    client = StibClient(source="belgian_mobility", session=session, cache=None)
+    calls = []
+    original = client._normalize_traveller_notices
+    client._normalize_traveller_notices = lambda *args: calls.append(1) or original(*args)
+
+    first, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
+    second, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
+
+    assert session.requests[1]["If-None-Match"] == '"v1"'
+    assert session.requests[1]["If-Modified-Since"] == "Sat, 17 Oct 2026 10:00:00 GMT"
+    assert first == second
+    assert second[0].text == "Line 18 diversion at Albert"
+    assert len(calls) == 1
+
+
+def test_identical_payload_without_validators_skips_normalization():
+    session = FakeSession([FakeResponse(content=NOTICE_PAYLOAD), FakeResponse(content=NOTICE_PAYLOAD)])
+    client = StibClient(source="belgian_mobility", session=session, cache=None)
+    calls = []
+    original = client._normalize_traveller_notices
+    client._normalize_traveller_notices = lambda *args: calls.append(1) or original(*args)
+
+    client.get_traveller_notices(MONITORED_LINES, STOPS)
+    client.get_traveller_notices(MONITORED_LINES, STOPS)
+
+    assert "If-None-Match" not in session.requests[1]
+    assert len(calls) == 1
+
+
+def test_notice_records_are_parsed_once_across_polls(monkeypatch):
+    memo = NoticeRecordMemo(max_entries=8)
+    monkeypatch.setattr(stib_client, "NOTICE_RECORD_MEMO", memo)
+    parsed = []
+
+    class CountingRecord(stib_client._NoticeRecord):
+        __slots__ = ()
+
+        def __init__(self, record):
+            parsed.append(record)
+            super().__init__(record)
+
+    monkeypatch.setattr(stib_client, "_NoticeRecord", CountingRecord)
+    unchanged = {
+        "content": '[{"text":[{"en":"Line 18 diversion. From 6 Jan, stop moved."}]}]',
+        "lines": '[{"id":"18"}]',
+        "points": '[{"id":"0711"}]',
+        "priority": 6,
+    }
+    changed = dict(unchanged, content='[{"text":[{"en":"Line 4 works at Heros"}]}]', lines='[{"id":"4"}]')
+
+    FakeClient(traveller_records=[unchanged]).get_traveller_notices(MONITORED_LINES, STOPS)
+    notices, _ = FakeClient(traveller_records=[dict(unchanged), changed]).get_traveller_notices(
+        MONITORED_LINES, STOPS
+    )
+
+    assert parsed == [unchanged, changed]
+    assert len(memo) == 2
+    assert notices[0].linked_date == "6 Jan"
+    assert [notice.lines for notice in notices] == [("18",), ("4",)]
+
+
+def test_notice_content_is_only_decoded_for_monitored_lines(monkeypatch):
+    monkeypatch.setattr(stib_client, "NOTICE_RECORD_MEMO", NoticeRecordMemo())
+    decoded = []
+    original = stib_client._extract_notice_text
+    monkeypatch.setattr(
+        stib_client, "_extract_notice_text", lambda raw: decoded.append(raw) or original(raw)
+    )
+    client = FakeClient(
+        traveller_records=[
+            {"content": '[{"text":[{"en":"Line 54 notice"}]}]', "lines": '[{"id":"54"}]', "priority": 7},
+            {"content": '[{"text":[{"en":"Line 4 advisory"}]}]', "lines": '[{"id":"4"}]', "priority": 3},
+            {"content": '[{"text":[{"en":"Line 10 notice"}]}]', "lines": '[{"id":"10"}]', "priority": 5},
+        ]
+    )
+
+    notices, _ = client.get_traveller_notices(MONITORED_LINES, STOPS)
+
+    assert [notice.text for notice in notices] == ["Line 10 notice"]
+    assert decoded == ['[{"text":[{"en":"Line 10 notice"}]}]']
+
+
+def test_json_decoder_falls_back_to_stdlib():
+    name, loads, errors = stib_client._load_json_decoder("json")
+
+    assert name == "json"
+    assert loads(b'{"results": []}') == {"results": []}
+    assert errors == (json.JSONDecodeError,)
+
+
+class DelayedSession:
+    def __init__(self, delays):
+        self.delays = dict(delays)
+        self.urls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.urls.append(url)
+        delay = self.delays.get(url, 0)
+        if isinstance(delay, Exception):
+            raise delay
+        time.sleep(delay)
+        return FakeResponse(content=json.dumps({"results": [], "source": url}).encode())
+
+
+def test_slow_requests_are_hedged_to_the_legacy_dataset():
+    session = DelayedSession({"https://example.test/rt/WaitingTimes": 1.0})
+    client = StibClient(
+        source="belgian_mobility",
+        base_url="https://example.test",
+        session=session,
+        cache=None,
+        hedge_after=0.05,
+        hedge_to_legacy=True,
+    )
+
+    started = time.monotonic()
+    payload = client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+
+    assert payload["source"] == stib_client.LEGACY_WAITING_TIMES_URL
+    assert time.monotonic() - started < 0.5
+    assert session.urls == ["https://example.test/rt/WaitingTimes", stib_client.LEGACY_WAITING_TIMES_URL]
+
+
+def test_open_circuit_serves_last_known_good_departures_without_calling_upstream():
+    client = PagedClient(
+        [
+            {
+                "total_count": 1,
+                "results": [
+                    {
+                        "lineid": "18",
+                        "pointid": "5830",
+                        "passingtimes": '[{"destination":{"fr":"ALBERT"},"expectedArrivalTime":"2099-03-27T10:31:00+01:00"}]',
+                    }
+                ],
+            }
+        ]
+    )
+    client.hedge_after = 0
+    fresh, error = client.get_line_departures({"18": STOPS})
+    client.pages = []
+    client.breakers["/rt/WaitingTimes"] = CircuitBreaker("/rt/WaitingTimes", failure_threshold=1)
+    requests_before = len(client.requests)
+
+    for _ in range(3):
+        stale, stale_error = client.get_line_departures({"18": STOPS})
+
+    assert error is None
+    assert len(client.requests) == requests_before + 1
+    assert client.breakers["/rt/WaitingTimes"].state == "open"
+    assert stale["18"]["5830"] == fresh["18"]["5830"]
+    assert stale_error.startswith("Departures are temporarily unavailable. Showing data from ")
+
+
+class LegacySession:
+    def __init__(self):
+        self.params = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        assert url == stib_client.LEGACY_WAITING_TIMES_URL
+        self.params.append(params)
+        results = [
+            {
+                "lineid": "18",
+                "pointid": pointid,
+                "passingtimes": '[{"destination":{"fr":"ALBERT"},"expectedArrivalTime":"2099-03-27T10:31:00+01:00"}]',
+            }
+            for pointid in ("5830", "0711", "6101")
+        ]
+        return FakeResponse(content=json.dumps({"total_count": len(results), "results": results}).encode())
+
+
+def test_legacy_line_departures_are_fetched_in_one_line_wide_query():
+    session = LegacySession()
+    client = StibClient(source="legacy", legacy_api_key="key", session=session, cache=None, hedge_after=0)
+
+    departures, error = client.get_line_departures({"18": STOPS})
+
+    assert error is None
+    assert len(session.params) == 1
+    assert session.params[0]["where"] == 'lineid="18"'
+    assert session.params[0]["apikey"] == "key"
+    assert session.params[0]["offset"] == 0
+    assert [dep.destination for dep in departures["18"]["0711"]] == ["ALBERT"]
+    assert [dep.destination for dep in departures["18"]["6101"]] == ["ALBERT"]
+
+
+class GatedSession:
+    def __init__(self, response=None):
+        self.response = response
+        self.calls = 0
+        self.release = threading.Event()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        self.release.wait(5)
+        if self.response is None:
+            raise ConnectionError("upstream reset")
+        return self.response
+
+
+def fetch_concurrently(client, callers):
+    results = [None] * callers
+
+    def call(index):
+        try:
+            results[index] = client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'})
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    session = GatedSession(FakeResponse(content=b'{"results": []}'))
+    client = StibClient(base_url="https://example.test", session=session, cache=ResponseCache(), hedge_after=0)
+
+    threads, results = fetch_concurrently(client, 8)
+    time.sleep(0.1)
+    session.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert session.calls == 1
+    assert all(result is results[0] for result in results)
+    assert results[0] == {"results": []}
+    assert client._in_flight == {}
+
+
+def test_coalesced_callers_get_the_error_and_the_next_request_retries():
+    session = GatedSession()
+    client = StibClient(base_url="https://example.test", session=session, cache=None, hedge_after=0)
+
+    threads, results = fetch_concurrently(client, 4)
+    time.sleep(0.1)
+    session.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert session.calls == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    session.response = FakeResponse(content=b'{"results": []}')
+    assert client._request_json("/rt/WaitingTimes", params={"where": 'lineid="18"'}) == {"results": []}
+    assert session.calls == 2
+
+
+def test_coalesced_callers_stop_waiting_after_the_coalesce_timeout(monkeypatch):
+    monkeypatch.setattr(stib_client, "COALESCE_WAIT_SECONDS", 0.05)
+    session = GatedSession(FakeResponse(content=b'{"results": []}'))
+    client = StibClient(base_url="https://example.test", session=session, cache=None, hedge_after=0)
+
+    threads, results = fetch_concurrently(client, 3)
+    time.sleep(0.3)
+    session.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert session.calls == 1
+    assert sum(result == {"results": []} for result in results) == 1
+    assert sum(isinstance(result, TimeoutError) for result in results) == 2
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tracing import bind, current_trace, finish_trace, span, start_trace
+
+
+def test_unsampled_requests_do_not_record_spans():
+    assert start_trace("dashboard", sample_rate=0) is None
+
+    with span("render"):
+        pass
+
+    assert current_trace() is None
+    assert finish_trace() is None
+
+
+def test_spans_from_pool_threads_are_aggregated_into_server_timing():
+    trace = start_trace("dashboard", request_id="abc-123", sample_rate=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for future in [pool.submit(bind(_upstream_call)) for _ in range(2)]:
+            future.result()
+    with span("render", "dashboard"):
+        pass
+
+    assert finish_trace() is trace
+    assert current_trace() is None
+    header = trace.server_timing()
+    assert 'upstream;desc="/rt/WaitingTimes x2";dur=' in header
+    assert 'render;desc="dashboard";dur=' in header
+    assert ", total;dur=" in header
+    payload = trace.to_dict()
+    assert payload["request_id"] == "abc-123"
+    assert [item["name"] for item in payload["spans"]].count("upstream") == 2
+
+
+def test_invalid_request_ids_are_replaced():
+    trace = start_trace("dashboard", request_id="bad id\n", sample_rate=1)
+    finish_trace()
+
+    assert trace.request_id != "bad id\n"
+    assert len(trace.request_id) == 32
+
+
+def _upstream_call():
+    with span("upstream", "/rt/WaitingTimes"):
+        pass
@@ -0,0 +1,144 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, TypeVar
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_LOG = os.getenv("TRACE_LOG", "").strip().lower() in {"1", "true", "yes"}
+REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+LOGGER = logging.getLogger("trace")
+F = TypeVar("F", bound=Callable[..., Any])
+
+_CURRENT: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+_DISABLED = nullcontext()
+
+
+class Trace:
+    def __init__(self, name: str, request_id: str) -> None:
+        self.name = name
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.duration: float | None = None
+        self.spans: list[tuple[str, str, float, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, detail: str = "") -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.spans.append((name, detail, started - self.started, duration))
+
+    def finish(self) -> "Trace":
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def server_timing(self) -> str:
+        totals: dict[tuple[str, str], list[float]] = {}
+        with self._lock:
+            for name, detail, _, duration in self.spans:
+                total = totals.setdefault((name, detail), [0.0, 0])
+                total[0] += duration
+                total[1] += 1
+
+        entries = []
+        for (name, detail), (duration, count) in totals.items():
+            description = f"{detail} x{count}".strip() if count > 1 else detail
+            desc = f';desc="{_quote(description)}"' if description else ""
+            entries.append(f"{name}{desc};dur={duration * 1000:.1f}")
+        if self.duration is not None:
+            entries.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item[2])
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "duration_ms": round((self.duration or 0.0) * 1000, 2),
+            "spans": [
+                {
+                    "name": name,
+                    "detail": detail,
+                    "start_ms": round(offset * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2),
+                }
+                for name, detail, offset, duration in spans
+            ],
+        }
+
+
+def start_trace(
+    name: str, request_id: str | None = None, sample_rate: float | None = None
+) -> Trace | None:
+    sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return None
+    if not request_id or not REQUEST_ID.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    trace = Trace(name, request_id)
+    _CURRENT.set(trace)
+    return trace
+
+
+def finish_trace() -> Trace | None:
+    trace = _CURRENT.get()
+    if trace is None:
+        return None
+    _CURRENT.set(None)
+    return trace.finish()
+
+
+def current_trace() -> Trace | None:
+    return _CURRENT.get()
+
+
+def span(name: str, detail: str = "") -> ContextManager[None]:
+    trace = _CURRENT.get()
+    if trace is None:
+        return _DISABLED
+    return trace.span(name, detail)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorate(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            trace = _CURRENT.get()
+            if trace is None:
+                return function(*args, **kwargs)
+            with trace.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def bind(function: F) -> F:
+    if _CURRENT.get() is None:
+        return function
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+def log_trace(trace: Trace, **fields: Any) -> None:
+    if TRACE_LOG:
+        LOGGER.info(json.dumps({**trace.to_dict(), **fields}, separators=(",", ":")))
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')